@@ -1,25 +1,43 @@
 import os
 import streamlit as st
 import streamlit.components.v1 as components
-from components.tablero_control import render_dashboard
-from components.simulador import render_simulator
-from components.historico import render_historical
-from components.informes import render_reports
 from components.theme_toggle import ThemeToggle
 from nucleo.utilidades import ensure_data_files
 
+# Serialización rápida de figuras Plotly hacia el frontend (orjson es opcional)
+try:
+    import orjson  # noqa: F401
+    import plotly.io as pio
+    pio.json.config.default_engine = "orjson"
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Opciones de navegación (constantes, se construyen una vez al importar)
+_PAGE_OPTIONS = ("🏠 Inicio", "🌊 Calculadora de Riego", "📊 Visualizaciones", "📈 Histórico y Análisis", "🎓 Simulador de Escenarios")
+
+
+@st.cache_resource(show_spinner=False)
+def _load_asset(path: str):
+    """Lee una imagen de assets/ una sola vez por proceso; None si no existe."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _image(path: str, width: int) -> None:
+    """Muestra una imagen de assets/ desde memoria (sin stat ni lectura por rerun)."""
+    data = _load_asset(path)
+    if data is not None:
+        st.image(data, width=width)
+
+
 # Asegurar archivos de datos
 ensure_data_files()
 
 # Inicializar tema por defecto (OSCURO)
 ThemeToggle.initialize_theme()
-if 'theme' not in st.session_state:
-    st.session_state.theme = 'dark'  # Tema oscuro por defecto
-
-# Restore page after theme change rerun
-if 'page_restore' in st.session_state:
-    st.session_state.current_page = st.session_state.page_restore
-    del st.session_state.page_restore
 
 # Configuración de página
 ThemeToggle.setup_page_config()
@@ -37,7 +55,7 @@ with st.sidebar:
     # Logo
     col1, col2 = st.columns([1, 4])
     with col1:
-        st.image("assets/images/icon-plant.png", width=40)
+        _image("assets/images/icon-plant.png", 40)
     with col2:
         st.subheader("Riego Inteligente")
         st.caption("Sistema Experto de Gestión Hídrica")
@@ -47,26 +65,13 @@ with st.sidebar:
     # Selector de página
     st.subheader("📋 Menú de Navegación")
 
-    page_options = ["🏠 Inicio", "🌊 Calculadora de Riego", "📊 Visualizaciones", "📈 Histórico y Análisis", "🎓 Simulador de Escenarios"]
-
-    # Maintain page selection
-    if 'current_page' not in st.session_state:
-        st.session_state.current_page = page_options[0]
-
-    page = st.session_state.current_page
-
-    # Navigation buttons in vertical list
-    for i, option in enumerate(page_options):
-        is_selected = st.session_state.current_page == option
-        if st.button(
-            option,
-            key=f"nav_{i}_{option}",
-            use_container_width=True,
-            type="primary" if is_selected else "secondary",
-            help=f"Ir a {option}"
-        ):
-            st.session_state.current_page = option
-            page = option
+    # Un solo widget de navegación; su key conserva la página entre reruns (incluido el cambio de tema)
+    page = st.radio(
+        "Menú de Navegación",
+        _PAGE_OPTIONS,
+        key="current_page",
+        label_visibility="collapsed",
+    )
 
     st.divider()
 
@@ -93,7 +98,7 @@ if page == "🏠 Inicio":
     # Header principal
     col1, col2 = st.columns([1, 5])
     with col1:
-        st.image("assets/images/logo.png", width=250)
+        _image("assets/images/logo.png", 250)
     with col2:
         st.title("Sistema de Riego Inteligente")
         st.subheader("Plataforma de Optimización Hídrica Basada en Lógica Difusa Tipo Mamdani")
@@ -251,11 +256,12 @@ if page == "🏠 Inicio":
 elif page == "🌊 Calculadora de Riego":
     col1, col2 = st.columns([1, 10])
     with col1:
-        st.image("assets/images/icon-water.png", width=100)
+        _image("assets/images/icon-water.png", 100)
     with col2:
         st.title("Calculadora de Riego")
         st.write("Ingrese los parámetros ambientales para calcular la cantidad óptima de agua necesaria.")
     st.divider()
+    from components.tablero_control import render_dashboard
     render_dashboard()
 
 # VISUALIZACIONES
@@ -270,20 +276,22 @@ elif page == "📊 Visualizaciones":
 elif page == "📈 Histórico y Análisis":
     col1, col2 = st.columns([1, 10])
     with col1:
-        st.image("assets/images/icon-history.png", width=100)
+        _image("assets/images/icon-history.png", 100)
     with col2:
         st.title("Análisis Histórico de Datos")
         st.write("Consulte y analice el historial de mediciones y recomendaciones del sistema.")
     st.divider()
+    from components.historico import render_historical
     render_historical()
 
 # SIMULADOR
 elif page == "🎓 Simulador de Escenarios":
     col1, col2 = st.columns([1, 10])
     with col1:
-        st.image("assets/images/icon-simulator.png", width=100)
+        _image("assets/images/icon-simulator.png", 100)
     with col2:
         st.title("Simulador de Escenarios")
         st.write("Pruebe diferentes condiciones ambientales y analice las respuestas del sistema.")
     st.divider()
+    from components.simulador import render_simulator
     render_simulator()
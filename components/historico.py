@@ -1,11 +1,20 @@
 from __future__ import annotations
 import csv
 import os
+import numpy as np
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from nucleo.utilidades import ensure_data_files, flush_history, lttb_indices
+import plotly.express as px
 import plotly.graph_objects as go
 
+try:
+    import pyarrow  # noqa: F401  (dependencia de streamlit)
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    _CSV_ENGINE = "c"
+
 
 class HistoryManager:
     """
@@ -13,22 +22,8 @@ class HistoryManager:
     """
 
     def __init__(self, path="data/history.csv"):  # Cambiado para usar el mismo archivo que el tablero de control
+        # El archivo (con encabezados) lo crea ensure_data_files() al arrancar la app
         self.path = os.path.abspath(path)
-        # Crear el archivo si no existe con encabezados compatibles
-        if not os.path.exists(self.path):
-            with open(self.path, mode="w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "ts",  # timestamp unix
-                    "temperatura",
-                    "humedad_suelo",
-                    "prob_lluvia",
-                    "humedad_ambiental",
-                    "viento",
-                    "planta",
-                    "tiempo_min",
-                    "frecuencia"
-                ])
 
     def registrar_decision(self, planta, humedad, temperatura, decision):
         """Guarda una decisión de riego en formato CSV."""
@@ -53,6 +48,44 @@ class HistoryManager:
 manager = HistoryManager("data/history.csv")
 
 
+# Tipos explícitos: evita la inferencia de tipos y reduce memoria (float32 + categoría)
+_HISTORY_DTYPES = {
+    "ts": "int64",
+    "temperatura": "float32",
+    "humedad_suelo": "float32",
+    "prob_lluvia": "float32",
+    "humedad_ambiental": "float32",
+    "viento": "float32",
+    "tiempo_min": "float32",
+    "frecuencia": "float32",
+    "confianza": "float32",
+    "planta": "category",
+}
+
+
+def _history_dtypes(path: str) -> dict:
+    """Tipos de _HISTORY_DTYPES limitados a las columnas presentes en el encabezado del CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    return {col: dtype for col, dtype in _HISTORY_DTYPES.items() if col in header}
+
+
+@st.cache_data(show_spinner=False)
+def _read_history(path: str, mtime: float) -> pd.DataFrame:
+    """Lee el CSV de histórico; `mtime` forma parte de la clave para invalidar al añadir registros.
+
+    Devuelve el frame ya enriquecido con `fecha_hora` y `fecha` (día, a medianoche),
+    así la conversión de fechas se hace una vez por versión del archivo y no en cada rerun.
+    """
+    df = pd.read_csv(path, dtype=_history_dtypes(path), engine=_CSV_ENGINE)
+    if 'ts' in df.columns:
+        df['fecha_hora'] = pd.to_datetime(df['ts'], unit='s')
+    elif 'fecha_hora' in df.columns:
+        df['fecha_hora'] = pd.to_datetime(df['fecha_hora'])
+    df['fecha'] = df['fecha_hora'].dt.normalize()
+    return df
+
+
 def _stats(df: pd.DataFrame) -> None:
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -63,21 +96,202 @@ def _stats(df: pd.DataFrame) -> None:
         st.metric("Humedad suelo promedio (%)", f"{df['humedad_suelo'].mean():.1f}" if len(df) else "-")
 
 
+# Submuestreo LTTB para historiales grandes (menos JSON y puntos que dibujar en el navegador)
+_DOWNSAMPLE_MIN_ROWS = 2000
+_DOWNSAMPLE_POINTS = 1000
+
+
+def _downsample(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Reduce `df` a ~_DOWNSAMPLE_POINTS filas por serie conservando la forma de cada curva."""
+    if len(df) <= _DOWNSAMPLE_MIN_ROWS:
+        return df
+    x = df["fecha_hora"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    idx = np.unique(np.concatenate([
+        lttb_indices(x, df[col].to_numpy(), _DOWNSAMPLE_POINTS) for col in columns
+    ]))
+    return df.iloc[idx]
+
+
+def _time_series(df: pd.DataFrame, series: dict, title: str, yaxis_title: str = "",
+                 width: int = 2, marker_size: int = 6):
+    """Serie temporal con plotly.express.
+
+    `series` mapea columna -> (nombre en la leyenda, color).
+    """
+    df = _downsample(df, series)
+    nombres = {col: nombre for col, (nombre, _) in series.items()}
+    fig = px.line(
+        df[["fecha_hora", *series]].rename(columns=nombres),
+        x="fecha_hora",
+        y=list(nombres.values()),
+        markers=True,
+        color_discrete_sequence=[color for _, color in series.values()],
+        title=title,
+    )
+    fig.update_traces(line_width=width, marker_size=marker_size)
+    fig.update_layout(
+        xaxis_title="Fecha y Hora",
+        yaxis_title=yaxis_title,
+        legend_title_text="",
+        showlegend=len(series) > 1,
+    )
+    return fig
+
+
+# Cada pestaña es un fragmento: sus widgets solo re-ejecutan esa región.
+# st.fragment existe desde streamlit 1.33 (antes st.experimental_fragment); sin él es un no-op.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+
+@_fragment
+def _tab_condiciones(df: pd.DataFrame) -> None:
+    """Condiciones ambientales registradas."""
+    st.markdown("##### Condiciones Ambientales Registradas")
+    col_a, col_b = st.columns(2)
+
+    with col_a:
+        fig1 = _time_series(
+            df,
+            {"humedad_suelo": ("Humedad Suelo (%)", "blue"), "prob_lluvia": ("Prob. Lluvia (%)", "cyan")},
+            title="🌱 Condiciones de Humedad",
+            yaxis_title="Porcentaje (%)",
+        )
+        st.plotly_chart(fig1, use_container_width=True)
+
+    with col_b:
+        fig2 = _time_series(
+            df,
+            {"temperatura": ("Temperatura (°C)", "red"), "viento": ("Velocidad Viento (km/h)", "orange")},
+            title="🌡️ Temperatura y Viento",
+        )
+        st.plotly_chart(fig2, use_container_width=True)
+
+
+@_fragment
+def _tab_riego(df: pd.DataFrame, stats: pd.DataFrame) -> None:
+    """Evolución del tiempo y la frecuencia de riego."""
+    st.markdown("##### Decisiones de Riego Inteligente")
+
+    fig3 = _time_series(
+        df,
+        {"tiempo_min": ("Tiempo de Riego (min)", "green")},
+        title="💧 Evolución del Tiempo de Riego Optimizado",
+        yaxis_title="Tiempo (min)",
+        width=3,
+        marker_size=8,
+    )
+    fig3.add_hline(
+        y=stats.at['mean', 'tiempo_min'],
+        line_dash="dash",
+        line_color="lightgreen",
+        annotation_text=f"Promedio: {stats.at['mean', 'tiempo_min']:.1f} min"
+    )
+    st.plotly_chart(fig3, use_container_width=True)
+
+    # Frecuencia
+    fig4 = _time_series(
+        df,
+        {"frecuencia": ("Frecuencia de Riego (x/día)", "purple")},
+        title="🔄 Patrón de Frecuencia de Riego",
+        yaxis_title="Veces por día",
+        width=3,
+        marker_size=8,
+    )
+    fig4.add_hline(
+        y=stats.at['mean', 'frecuencia'],
+        line_dash="dash",
+        line_color="violet",
+        annotation_text=f"Promedio: {stats.at['mean', 'frecuencia']:.1f} x/día"
+    )
+    st.plotly_chart(fig4, use_container_width=True)
+
+
+@_fragment
+def _tab_estadisticas(df: pd.DataFrame, stats: pd.DataFrame) -> None:
+    """Métricas resumen y distribución de tiempos."""
+    st.markdown("##### 📊 Estadísticas Avanzadas de Rendimiento")
+
+    # Agua estimada = tiempo * 5 L/min (mismo criterio que el KPI superior)
+    tiempo_st = stats['tiempo_min']
+    temp_st = stats['temperatura']
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("⏱️ Tiempo Promedio", f"{tiempo_st['mean']:.1f} min")
+        st.metric("🌡️ Temperatura Media", f"{temp_st['mean']:.1f} °C")
+        st.metric("💧 Agua Promedio", f"{tiempo_st['mean'] * 5:.1f} L")
+
+    with col2:
+        st.metric("📈 Tiempo Máximo", f"{tiempo_st['max']:.1f} min")
+        st.metric("🌡️ Temp. Máxima", f"{temp_st['max']:.1f} °C")
+        st.metric("💧 Agua Máxima", f"{tiempo_st['max'] * 5:.1f} L")
+
+    with col3:
+        st.metric("📉 Tiempo Mínimo", f"{tiempo_st['min']:.1f} min")
+        st.metric("🌡️ Temp. Mínima", f"{temp_st['min']:.1f} °C")
+        st.metric("💧 Agua Mínima", f"{tiempo_st['min'] * 5:.1f} L")
+
+    # Distribución de tiempos
+    fig5 = px.histogram(
+        df,
+        x='tiempo_min',
+        nbins=min(30, len(df)),
+        color_discrete_sequence=['lightgreen'],
+        title="📊 Distribución de Tiempos de Riego",
+    )
+    fig5.update_layout(xaxis_title="Tiempo (min)", yaxis_title="Frecuencia")
+    st.plotly_chart(fig5, use_container_width=True)
+
+
+@_fragment
+def _tab_plantas(df: pd.DataFrame) -> None:
+    """Rendimiento agregado por tipo de planta."""
+    st.markdown("##### 🔍 Rendimiento por Tipo de Planta")
+
+    if len(df['planta'].unique()) > 0:
+        plant_summary = df.groupby('planta', observed=True).agg({
+            'tiempo_min': ['mean', 'median', 'count'],
+            'temperatura': 'mean',
+            'humedad_suelo': 'mean'
+        }).round(2)
+
+        plant_summary.columns = ['Tiempo Promedio', 'Tiempo Mediano', 'Total Riegos', 'Temp Media', 'Humedad Media']
+        plant_summary = plant_summary.reset_index()
+
+        st.dataframe(plant_summary, use_container_width=True)
+
+        # Gráfico comparativo por planta
+        fig6 = go.Figure()
+        fig6.add_trace(go.Bar(
+            x=plant_summary['planta'],
+            y=plant_summary['Tiempo Promedio'],
+            name='Tiempo Promedio (min)'
+        ))
+        fig6.update_layout(
+            title="🌱 Comparación de Tiempo de Riego por Planta",
+            xaxis_title="Tipo de Planta"
+        )
+        st.plotly_chart(fig6, use_container_width=True)
+    else:
+        st.info("No hay datos suficientes para análisis por planta.")
+
+
 def render_historical() -> None:
     st.title("📈 Histórico y Análisis")
 
+    # Volcar registros pendientes del tablero antes de leer el archivo
+    flush_history()
+
     # Leer el dataframe usando el mismo archivo que guarda el tablero de control
-    df = pd.read_csv(manager.path, low_memory=False) if os.path.exists(manager.path) else pd.DataFrame()
+    mtime = os.path.getmtime(manager.path) if os.path.exists(manager.path) else None
+    df = _read_history(manager.path, mtime) if mtime is not None else pd.DataFrame()
 
     if df.empty or len(df) == 0:
         st.info("Aún no hay registros. Usa la calculadora de riego para generar decisiones históricas.")
         return
 
-    # Convertir timestamp unix a datetime legible
-    if 'ts' in df.columns:
-        df['fecha_hora'] = pd.to_datetime(df['ts'], unit='s')
-    else:
-        df['fecha_hora'] = pd.to_datetime(df['ts']) if 'fecha_hora' not in df.columns else pd.to_datetime(df['fecha_hora'])
+    # Un único mask booleano para todos los filtros; se selecciona una sola vez al final
+    mask = np.ones(len(df), dtype=bool)
 
     with st.expander("🔍 Filtros de Búsqueda"):
         col1, col2, col3 = st.columns(3)
@@ -85,12 +299,13 @@ def render_historical() -> None:
         with col1:
             plantas = st.multiselect("🌱 Plantas", sorted(df["planta"].unique().tolist()), key="plant_filter")
             if plantas:
-                df = df[df["planta"].isin(plantas)].copy()
+                mask &= df["planta"].isin(plantas).to_numpy()
 
         with col2:
             # Filtro de fecha
-            min_date = df['fecha_hora'].min().date()
-            max_date = df['fecha_hora'].max().date()
+            fechas = df['fecha_hora'][mask]
+            min_date = fechas.min().date()
+            max_date = fechas.max().date()
             date_range = st.date_input(
                 "📅 Rango fechas",
                 value=(min_date, max_date),
@@ -99,17 +314,30 @@ def render_historical() -> None:
                 key="date_filter"
             )
             if len(date_range) == 2:
-                df = df[(df['fecha_hora'].dt.date >= date_range[0]) & (df['fecha_hora'].dt.date <= date_range[1])].copy()
+                # Comparación vectorizada datetime64 (sin materializar objetos date)
+                mask &= df['fecha'].between(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])).to_numpy()
 
         with col3:
             # Filtro de temperatura
+            temps = df['temperatura'][mask]
             temp_range = st.slider(
                 "🌡️ Temperatura (°C)",
                 0, 50,
-                (int(df['temperatura'].min()), int(df['temperatura'].max())),
+                (int(temps.min()), int(temps.max())),
                 key="temp_filter"
             )
-            df = df[(df['temperatura'] >= temp_range[0]) & (df['temperatura'] <= temp_range[1])].copy()
+            mask &= df['temperatura'].between(temp_range[0], temp_range[1]).to_numpy()
+
+    # Reutilizar el frame filtrado (y sus estadísticas) si la firma de filtros no cambió
+    sig = (tuple(plantas), tuple(date_range), tuple(temp_range), mtime)
+    if st.session_state.get('hist_sig') == sig:
+        df, stats = st.session_state['hist_df']
+    else:
+        df = df.loc[mask]
+        # Estadísticas en una sola pasada (reutilizadas por las líneas de promedio y las métricas)
+        stats = df[['tiempo_min', 'temperatura', 'frecuencia']].agg(['mean', 'max', 'min'])
+        st.session_state['hist_sig'] = sig
+        st.session_state['hist_df'] = (df, stats)
 
     # KPIs actualizados
     col1, col2, col3, col4 = st.columns(4)
@@ -133,165 +361,16 @@ def render_historical() -> None:
     tab1, tab2, tab3, tab4 = st.tabs(["🌿 Condiciones Ambientales", "💧 Riego Optimizado", "📊 Estadísticas Avanzadas", "🔍 Tendencias por Planta"])
 
     with tab1:
-        st.markdown("##### Condiciones Ambientales Registradas")
-        col_a, col_b = st.columns(2)
-
-        with col_a:
-            fig1 = go.Figure()
-            fig1.add_trace(go.Scatter(
-                x=df["fecha_hora"], y=df["humedad_suelo"],
-                mode="lines+markers",
-                name="Humedad Suelo (%)",
-                line=dict(color='blue', width=2),
-                marker=dict(size=6)
-            ))
-            fig1.add_trace(go.Scatter(
-                x=df["fecha_hora"], y=df["prob_lluvia"],
-                mode="lines+markers",
-                name="Prob. Lluvia (%)",
-                line=dict(color='cyan', width=2),
-                marker=dict(size=6)
-            ))
-            fig1.update_layout(
-                title="🌱 Condiciones de Humedad",
-                xaxis_title="Fecha y Hora",
-                yaxis_title="Porcentaje (%)",
-                showlegend=True
-            )
-            st.plotly_chart(fig1, use_container_width=True)
-
-        with col_b:
-            fig2 = go.Figure()
-            fig2.add_trace(go.Scatter(
-                x=df["fecha_hora"], y=df["temperatura"],
-                mode="lines+markers",
-                name="Temperatura (°C)",
-                line=dict(color='red', width=2),
-                marker=dict(size=6)
-            ))
-            fig2.add_trace(go.Scatter(
-                x=df["fecha_hora"], y=df["viento"],
-                mode="lines+markers",
-                name="Velocidad Viento (km/h)",
-                line=dict(color='orange', width=2),
-                marker=dict(size=6)
-            ))
-            fig2.update_layout(
-                title="🌡️ Temperatura y Viento",
-                xaxis_title="Fecha y Hora",
-                showlegend=True
-            )
-            st.plotly_chart(fig2, use_container_width=True)
+        _tab_condiciones(df)
 
     with tab2:
-        st.markdown("##### Decisiones de Riego Inteligente")
-
-        fig3 = go.Figure()
-        fig3.add_trace(go.Scatter(
-            x=df["fecha_hora"], y=df["tiempo_min"],
-            mode="lines+markers",
-            name="Tiempo de Riego (min)",
-            line=dict(color='green', width=3),
-            marker=dict(size=8, color='green')
-        ))
-        fig3.add_hline(
-            y=df['tiempo_min'].mean(),
-            line_dash="dash",
-            line_color="lightgreen",
-            annotation_text=f"Promedio: {df['tiempo_min'].mean():.1f} min"
-        )
-        fig3.update_layout(
-            title="💧 Evolución del Tiempo de Riego Optimizado",
-            xaxis_title="Fecha y Hora",
-            yaxis_title="Tiempo (min)"
-        )
-        st.plotly_chart(fig3, use_container_width=True)
-
-        # Frecuencia
-        fig4 = go.Figure()
-        fig4.add_trace(go.Scatter(
-            x=df["fecha_hora"], y=df["frecuencia"],
-            mode="lines+markers",
-            name="Frecuencia de Riego (x/día)",
-            line=dict(color='purple', width=3),
-            marker=dict(size=8, color='purple')
-        ))
-        fig4.add_hline(
-            y=df['frecuencia'].mean(),
-            line_dash="dash",
-            line_color="violet",
-            annotation_text=f"Promedio: {df['frecuencia'].mean():.1f} x/día"
-        )
-        fig4.update_layout(
-            title="🔄 Patrón de Frecuencia de Riego",
-            xaxis_title="Fecha y Hora",
-            yaxis_title="Veces por día"
-        )
-        st.plotly_chart(fig4, use_container_width=True)
+        _tab_riego(df, stats)
 
     with tab3:
-        st.markdown("##### 📊 Estadísticas Avanzadas de Rendimiento")
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("⏱️ Tiempo Promedio", ".1f")
-            st.metric("🌡️ Temperatura Media", ".1f")
-            st.metric("💧 Agua Promedio", ".1f")
-
-        with col2:
-            st.metric("📈 Tiempo Máximo", ".1f")
-            st.metric("🌡️ Temp. Máxima", ".1f")
-            st.metric("💧 Agua Máxima", ".1f")
-
-        with col3:
-            st.metric("📉 Tiempo Mínimo", ".1f")
-            st.metric("🌡️ Temp. Mínima", ".1f")
-            st.metric("💧 Agua Mínima", ".1f")
-
-        # Distribución de tiempos
-        fig5 = go.Figure()
-        fig5.add_trace(go.Histogram(
-            x=df['tiempo_min'],
-            nbinsx=min(30, len(df)),
-            marker_color='lightgreen',
-            name='Frecuencia'
-        ))
-        fig5.update_layout(
-            title="📊 Distribución de Tiempos de Riego",
-            xaxis_title="Tiempo (min)",
-            yaxis_title="Frecuencia"
-        )
-        st.plotly_chart(fig5, use_container_width=True)
+        _tab_estadisticas(df, stats)
 
     with tab4:
-        st.markdown("##### 🔍 Rendimiento por Tipo de Planta")
-
-        if len(df['planta'].unique()) > 0:
-            plant_summary = df.groupby('planta').agg({
-                'tiempo_min': ['mean', 'median', 'count'],
-                'temperatura': 'mean',
-                'humedad_suelo': 'mean'
-            }).round(2)
-
-            plant_summary.columns = ['Tiempo Promedio', 'Tiempo Mediano', 'Total Riegos', 'Temp Media', 'Humedad Media']
-            plant_summary = plant_summary.reset_index()
-
-            st.dataframe(plant_summary, use_container_width=True)
-
-            # Gráfico comparativo por planta
-            fig6 = go.Figure()
-            fig6.add_trace(go.Bar(
-                x=plant_summary['planta'],
-                y=plant_summary['Tiempo Promedio'],
-                name='Tiempo Promedio (min)'
-            ))
-            fig6.update_layout(
-                title="🌱 Comparación de Tiempo de Riego por Planta",
-                xaxis_title="Tipo de Planta"
-            )
-            st.plotly_chart(fig6, use_container_width=True)
-        else:
-            st.info("No hay datos suficientes para análisis por planta.")
+        _tab_plantas(df)
 
     # Opciones finales
     st.subheader("💾 Gestión de Datos")
@@ -299,10 +378,11 @@ def render_historical() -> None:
 
     with col_exp:
         if st.button("📋 Exportar Datos CSV", key="export_hist"):
-            csv_content = df.to_csv(index=False)
+            # Directo a bytes en memoria, sin archivo temporal
+            csv_bytes = df.drop(columns='fecha').to_csv(index=False).encode('utf-8')
             st.download_button(
                 label="⬇️ Descargar Histórico Completo",
-                data=csv_content,
+                data=csv_bytes,
                 file_name="historico_riego.csv",
                 mime="text/csv",
                 key="download_hist"
@@ -313,7 +393,8 @@ def render_historical() -> None:
             if st.button("⚠️ CONFIRMAR LIMPIEZA TOTAL", type="primary", key="confirm_clear") or st.checkbox("Confirmo eliminación completa", key="confirm_check"):
                 if os.path.exists(manager.path):
                     os.remove(manager.path)
-                    manager.__init__(manager.path)
+                    ensure_data_files()
+                    _read_history.clear()
                     st.success("✅ Histórico eliminado completamente.")
                     st.rerun()
                 else:
@@ -1,11 +1,11 @@
 from __future__ import annotations
+import copy
 import os
 import io
 from typing import Dict, List
 import streamlit as st
 from fpdf import FPDF
 from nucleo.base_conocimientos import PLANT_KB
-from nucleo.utilidades import export_history_csv
 
 
 class _PDF(FPDF):
@@ -15,6 +15,15 @@ class _PDF(FPDF):
         self.ln(2)
 
 
+@st.cache_resource(show_spinner=False)
+def _template_pdf() -> _PDF:
+    """Documento base con la primera página y el encabezado ya maquetados."""
+    pdf = _PDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
+
+
 def _pdf_section(pdf: _PDF, title: str, lines: List[str]) -> None:
     pdf.set_font("Arial", "B", 12)
     pdf.cell(0, 8, title, ln=1)
@@ -33,9 +42,8 @@ def generate_pdf_report(datos: Dict[str, float]) -> bytes:
       "tiempo_min": float, "frecuencia": float
     }
     """
-    pdf = _PDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
+    # Se clona la plantilla compartida; nunca se escribe sobre ella
+    pdf = copy.deepcopy(_template_pdf())
 
     _pdf_section(
         pdf,
@@ -53,14 +61,18 @@ def generate_pdf_report(datos: Dict[str, float]) -> bytes:
         pdf,
         "Decisión",
         [
-            f"Tiempo recomendado: {float(datos.get('tiempo_min',0)):.1f} min",
-            f"Frecuencia diaria: {float(datos.get('frecuencia',0)):.2f} veces",
+            f"Tiempo recomendado: {datos.get('tiempo_min',0):.1f} min",
+            f"Frecuencia diaria: {datos.get('frecuencia',0):.2f} veces",
         ],
     )
     kb = PLANT_KB.get(datos.get("planta", ""), {})
     _pdf_section(pdf, "Recomendaciones", [kb.get("consejos", "")])
 
-    return pdf.output(dest="S").encode("latin1")
+    salida = pdf.output(dest="S")
+    # fpdf2 ya entrega bytes; fpdf 1.7.x entrega str latin-1 y hay que codificarlo
+    if isinstance(salida, (bytes, bytearray)):
+        return bytes(salida)
+    return salida.encode("latin1")
 
 
 def render_reports() -> None:
@@ -81,13 +93,13 @@ def render_reports() -> None:
     if submitted:
         datos = {
             "planta": planta,
-            "temperatura": float(temperatura),
-            "humedad_suelo": float(humedad_suelo),
-            "prob_lluvia": float(prob_lluvia),
-            "humedad_ambiental": float(humedad_ambiental),
-            "viento": float(viento),
-            "tiempo_min": float(tiempo_min),
-            "frecuencia": float(frecuencia),
+            "temperatura": temperatura,
+            "humedad_suelo": humedad_suelo,
+            "prob_lluvia": prob_lluvia,
+            "humedad_ambiental": humedad_ambiental,
+            "viento": viento,
+            "tiempo_min": tiempo_min,
+            "frecuencia": frecuencia,
         }
         pdf = generate_pdf_report(datos)
         st.success("Reporte generado")
@@ -1,13 +1,70 @@
 from __future__ import annotations
-import json
 import random
-from typing import Dict, List, Optional
+import traceback
+from types import MappingProxyType
+from typing import Dict, List
+import numpy as np
 import streamlit as st
 import pandas as pd
 from nucleo.base_conocimientos import PLANT_KB, PLANTS
+from nucleo.utilidades import logger
+
+# Factor de ajuste por planta (tabla plana de solo lectura, se arma al importar)
+_PLANT_FACTORS = MappingProxyType({k: v.get("factor_ajuste", 1.0) for k, v in PLANT_KB.items()})
+
+
+def _get_engine():
+    """Motor difuso compartido del proceso (el mismo que usan el tablero y las visualizaciones)."""
+    from nucleo.motor_difuso import get_engine
+    return get_engine()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _calc(
+    temperatura: float,
+    humedad_suelo: float,
+    prob_lluvia: float,
+    humedad_ambiental: float,
+    viento: float,
+    planta: str,
+):
+    """Inferencia difusa memoizada por escenario: devuelve (tiempo_min, frecuencia)."""
+    t, f, _ = _get_engine().calculate_irrigation(
+        temperature=temperatura,
+        soil_humidity=humedad_suelo,
+        rain_probability=prob_lluvia,
+        air_humidity=humedad_ambiental,
+        wind_speed=viento,
+        ajuste_planta=_PLANT_FACTORS.get(planta, 1.0),
+    )
+    return round(t, 2), round(f, 2)
+
+
+def _infer_batch(claves: tuple) -> List[tuple]:
+    """Inferencia por lotes: una tupla (tiempo_min, frecuencia) por clave de escenario."""
+    columnas = list(zip(*claves))
+    ajustes = np.fromiter(
+        (_PLANT_FACTORS.get(p, 1.0) for p in columnas[5]),
+        dtype=float,
+        count=len(claves),
+    )
+    tiempos, frecuencias = _get_engine().calculate_irrigation_batch(
+        *(np.asarray(c, dtype=float) for c in columnas[:5]), ajustes
+    )
+    return list(zip(tiempos.round(2).tolist(), frecuencias.round(2).tolist()))
+
+
+def _scenario_key(escenario: Dict) -> tuple:
+    """Clave hashable (t, hs, pl, ha, v, planta) de un escenario."""
+    return (
+        escenario["temperatura"],
+        escenario["humedad_suelo"],
+        escenario["prob_lluvia"],
+        escenario["humedad_ambiental"],
+        escenario["viento"],
+        escenario.get("planta", "Tomate"),
+    )
 
-SCENARIOS_PATH = "data/escenarios_prueba.json"
-_engine: Optional['SistemaRiegoDifuso'] = None
 
 # Escenarios requeridos por la especificación
 ESCENARIOS = {
@@ -18,6 +75,21 @@ ESCENARIOS = {
     "🌪️ Día Ventoso": {"temperatura": 25, "humedad_suelo": 40, "prob_lluvia": 20, "humedad_ambiental": 45, "viento": 50, "planta": "Césped"},
     "🌤️ Condiciones Ideales": {"temperatura": 22, "humedad_suelo": 55, "prob_lluvia": 20, "humedad_ambiental": 50, "viento": 10, "planta": "Fresa"},
 }
+_ESC_NAMES = tuple(ESCENARIOS.keys())
+_ESC_ITEMS = tuple(ESCENARIOS.items())
+
+
+@st.cache_resource(show_spinner=False)
+def _precomputed_results() -> Dict[str, Dict[str, float]]:
+    """Resultados de los escenarios predefinidos (deterministas), calculados una vez.
+
+    Compartido entre sesiones: los llamadores solo lo leen.
+    """
+    claves = tuple(_scenario_key(e) for e in ESCENARIOS.values())
+    return {
+        nombre: {"tiempo_min": t, "frecuencia": f}
+        for nombre, (t, f) in zip(ESCENARIOS, _infer_batch(claves))
+    }
 
 
 def run_simulation(nombre: str) -> Dict[str, float]:
@@ -26,17 +98,8 @@ def run_simulation(nombre: str) -> Dict[str, float]:
     if not s:
         return {}
     try:
-        from nucleo.motor_difuso import SistemaRiegoDifuso
-        engine = SistemaRiegoDifuso()
-        t, f, _ = engine.calculate_irrigation(
-            temperature=s["temperatura"],
-            soil_humidity=s["humedad_suelo"],
-            rain_probability=s["prob_lluvia"],
-            air_humidity=s["humedad_ambiental"],
-            wind_speed=s["viento"],
-            ajuste_planta=PLANT_KB.get(s.get("planta", "Tomate"), {}).get("factor_ajuste", 1.0),
-        )
-        return {"tiempo_min": round(t, 2), "frecuencia": round(f, 2)}
+        t, f = _calc(*_scenario_key(s))
+        return {"tiempo_min": t, "frecuencia": f}
     except Exception as e:
         st.error(f"Error en simulación {nombre}: {e}")
         return {"tiempo_min": 15.0, "frecuencia": 2.0}
@@ -45,28 +108,16 @@ def run_simulation(nombre: str) -> Dict[str, float]:
 def run_simulation_custom(escenario: Dict) -> Dict[str, float]:
     """Nueva función para escenarios personalizados"""
     try:
-        from nucleo.motor_difuso import SistemaRiegoDifuso
-        engine = SistemaRiegoDifuso()
-        t, f, _ = engine.calculate_irrigation(
-            temperature=escenario["temperatura"],
-            soil_humidity=escenario["humedad_suelo"],
-            rain_probability=escenario["prob_lluvia"],
-            air_humidity=escenario["humedad_ambiental"],
-            wind_speed=escenario["viento"],
-            ajuste_planta=PLANT_KB.get(escenario.get("planta", "Tomate"), {}).get("factor_ajuste", 1.0),
-        )
-        return {"tiempo_min": round(t, 2), "frecuencia": round(f, 2)}
+        t, f = _calc(*_scenario_key(escenario))
+        return {"tiempo_min": t, "frecuencia": f}
     except Exception as e:
         st.error(f"Error en cálculo personalizado: {e}")
         return {"tiempo_min": 15.0, "frecuencia": 2.0}
 
 
-def _load_scenarios() -> List[Dict]:
-    try:
-        with open(SCENARIOS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+def _as_markdown(datos: Dict) -> str:
+    """Lista Markdown `- **clave**: valor` (más ligera que st.json)."""
+    return "\n".join(f"- **{k}**: {v}" for k, v in datos.items())
 
 
 def render_simulator() -> None:
@@ -82,8 +133,7 @@ def render_simulator() -> None:
 
         with col1:
             st.markdown("**Configurar Escenario**")
-            esc_names = list(ESCENARIOS.keys())
-            nombre = st.selectbox("Seleccionar escenario predefinido", esc_names, key="scenario_select")
+            nombre = st.selectbox("Seleccionar escenario predefinido", _ESC_NAMES, key="scenario_select")
 
             st.markdown("**O configurar manualmente**")
             use_custom = st.checkbox("Usar configuración personalizada", value=False, key="custom_scenario")
@@ -126,7 +176,7 @@ def render_simulator() -> None:
 
         with col2:
             st.markdown("**Condiciones del Escenario**")
-            st.json(escenario_actual)
+            st.markdown(_as_markdown(escenario_actual))
 
             # Guardar configuración siempre para compartir con visualizaciones
             st.session_state['simulador_current'] = {
@@ -187,33 +237,37 @@ def render_simulator() -> None:
             if st.button("🎯 Ejecutar Simulación Completa", key="run_all_scenarios"):
                 with st.spinner("Simulando todos los escenarios..."):
                     rows = []
+                    precalculados = _precomputed_results()
                     for nombre_sc, escenario_data in ESCENARIOS.items():
-                        resultado = run_simulation_custom(escenario_data)
+                        resultado = precalculados.get(nombre_sc)
                         if resultado:
                             rows.append({
                                 "Escenario": nombre_sc,
                                 "Planta": escenario_data["planta"],
                                 "Temp(°C)": escenario_data["temperatura"],
                                 "HumSuelo(%)": escenario_data["humedad_suelo"],
-                                "Tiempo(min)": ".1f",
-                                "Frecuencia": ".2f",
+                                "Tiempo(min)": round(resultado['tiempo_min'], 1),
+                                "Frecuencia": round(resultado['frecuencia'], 2),
                                 "Prioridad": "Alta" if resultado['tiempo_min'] > 25 else "Media" if resultado['tiempo_min'] > 15 else "Baja"
                             })
 
                     if rows:
-                        df_resultados = pd.DataFrame(rows)
+                        # Seis filas: se ordenan en Python antes de armar el DataFrame
+                        rows.sort(key=lambda r: r["Tiempo(min)"], reverse=True)
                         st.success("✅ **Simulación completada exitosamente**")
 
                         # Mostrar tabla ordenada
-                        st.dataframe(df_resultados.sort_values("Tiempo(min)", ascending=False), use_container_width=True)
+                        st.dataframe(pd.DataFrame(rows), use_container_width=True)
 
                         # Estadísticas resumen
                         st.markdown("#### 📊 Resumen Estadístico")
+                        prom = sum(r["Tiempo(min)"] for r in rows) / len(rows)
+                        mx = rows[0]["Tiempo(min)"]
                         col_stats1, col_stats2, col_stats3 = st.columns(3)
                         with col_stats1:
-                            st.metric("Promedio Tiempo", ".1f")
+                            st.metric("Promedio Tiempo", f"{prom:.1f} min")
                         with col_stats2:
-                            st.metric("Máximo Tiempo", ".1f")
+                            st.metric("Máximo Tiempo", f"{mx:.1f} min")
                         with col_stats3:
                             st.metric("Escenarios Simulados", len(rows))
                     else:
@@ -224,10 +278,10 @@ def render_simulator() -> None:
             st.markdown("¡Pon a prueba tu intuición agrícola!")
 
             if "current_challenge" not in st.session_state:
-                st.session_state.current_challenge = random.choice(list(ESCENARIOS.items())) if ESCENARIOS else None
+                st.session_state.current_challenge = random.choice(_ESC_ITEMS) if _ESC_ITEMS else None
 
             if st.button("🎯 Nuevo Desafío", key="new_challenge"):
-                st.session_state.current_challenge = random.choice(list(ESCENARIOS.items())) if ESCENARIOS else None
+                st.session_state.current_challenge = random.choice(_ESC_ITEMS) if _ESC_ITEMS else None
 
             challenge = st.session_state.get("current_challenge")
             if challenge:
@@ -235,15 +289,20 @@ def render_simulator() -> None:
 
                 # Mostrar condiciones sin la respuesta
                 st.markdown(f"**Escenario:** {nombre_ch}")
-                condiciones_display = {
-                    "🌡️ Temperatura": f"{data_ch['temperatura']} °C",
-                    "💧 Humedad del suelo": ".0f",
-                    "🌧️ Probabilidad de lluvia": ".0f",
-                    "💨 Humedad del aire": ".0f",
-                    "🌪️ Velocidad del viento": ".0f",
-                    "🌱 Planta": data_ch.get("planta", "Tomate")
-                }
-                st.json(condiciones_display)
+                # El texto se reconstruye solo cuando cambia el desafío
+                cond_md = st.session_state.get("challenge_md")
+                if not cond_md or cond_md[0] != nombre_ch:
+                    condiciones_display = {
+                        "🌡️ Temperatura": f"{data_ch['temperatura']} °C",
+                        "💧 Humedad del suelo": f"{data_ch['humedad_suelo']:.0f} %",
+                        "🌧️ Probabilidad de lluvia": f"{data_ch['prob_lluvia']:.0f} %",
+                        "💨 Humedad del aire": f"{data_ch['humedad_ambiental']:.0f} %",
+                        "🌪️ Velocidad del viento": f"{data_ch['viento']:.0f} km/h",
+                        "🌱 Planta": data_ch.get("planta", "Tomate")
+                    }
+                    cond_md = (nombre_ch, _as_markdown(condiciones_display))
+                    st.session_state["challenge_md"] = cond_md
+                st.markdown(cond_md[1])
 
                 # Input del usuario
                 st.markdown("**Tu estimación:**")
@@ -251,7 +310,7 @@ def render_simulator() -> None:
 
                 if st.button("🔥 Revelar Resultado", key="reveal_challenge"):
                     with st.spinner("Calculando..."):
-                        real_result = run_simulation_custom(data_ch)
+                        real_result = _precomputed_results().get(nombre_ch) or run_simulation_custom(data_ch)
 
                     if real_result:
                         real_time = real_result['tiempo_min']
@@ -269,7 +328,7 @@ def render_simulator() -> None:
                         with col_res1:
                             st.metric("Tu Estimación", f"{user_guess:.1f} min")
                         with col_res2:
-                            st.metric("Sistema Recomienda", ".1f")
+                            st.metric("Sistema Recomienda", f"{real_time:.1f} min")
                     else:
                         st.error("❌ Error en el cálculo del desafío")
             else:
@@ -306,5 +365,7 @@ def render_simulator() -> None:
 
     except Exception as e:
         st.error(f"❌ Error en el simulador: {e}")
-        import traceback
-        st.code(f"Traceback completo:\n{traceback.format_exc()}")
+        logger.exception("Error en el simulador")
+        # El traceback completo solo se muestra en modo depuración
+        if st.session_state.get("debug_mode", False):
+            st.code(f"Traceback completo:\n{traceback.format_exc()}")
@@ -1,15 +1,85 @@
 from __future__ import annotations
-import time
+from heapq import nlargest
+from operator import itemgetter
+import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
-from nucleo.motor_difuso import SistemaRiegoDifuso
+from nucleo.motor_difuso import RULE_NAMES, activations_to_array, get_engine as _get_engine
 from nucleo.base_conocimientos import PLANT_KB, PLANTS, get_recomendacion
-from nucleo.utilidades import validate_inputs, save_history, timestamp, estimate_water_saving, logger
+from nucleo.utilidades import validate_inputs, queue_history, timestamp, estimate_water_saving, logger
+
+# Niveles de impacto por activación: [0, 0.3) Bajo, [0.3, 0.7) Medio, [0.7, 1] Alto
+_IMPACT_BINS = np.array([0.3, 0.7])
+_IMPACT_LABELS = np.array(["Bajo", "Medio", "Alto"])
+_RULE_KEYS = np.array(RULE_NAMES)
+
+# Color del gauge de confianza por décima de porcentaje (0.0..100.0 -> índice 0..1000)
+_PCT_GRID = np.arange(1001) / 10.0
+_PCT_COLOR = np.where(_PCT_GRID < 40.0, "red", np.where(_PCT_GRID < 70.0, "yellow", "green"))
+
+# Piezas estáticas de las figuras: Plotly copia lo que recibe, así que se comparten sin riesgo
+_GAUGE_STEPS_CONF = (
+    {'range': [0, 40], 'color': "lightcoral"},
+    {'range': [40, 70], 'color': "lightyellow"},
+    {'range': [70, 100], 'color': "lightgreen"},
+)
+_BAR_COLORSCALE = (
+    (0.0, '#e3f2fd'),  # Azul muy claro
+    (0.3, '#2196f3'),  # Azul
+    (0.7, '#ff9800'),  # Naranja
+    (1.0, '#f44336'),  # Rojo
+)
+_COLORBAR_ACT = {'title': "Activación", 'titleside': "right", 'tickformat': ".2f"}
+_COLORBAR_SIMPLE = {'title': "Activación"}
+_TRACE_XAXIS = {'title': "Nivel de Activación (0-1)", 'range': [0, 1.1], 'tickformat': ".2f"}
+# autorange invertido para que la regla más activa aparezca arriba
+_TRACE_YAXIS = {'title': "Regla Fuzzy", 'autorange': "reversed"}
+_TRACE_MARGIN = {'l': 200, 'r': 100, 't': 50, 'b': 50}
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_calc(
+    temperature: float,
+    soil_humidity: float,
+    rain_probability: float,
+    air_humidity: float,
+    wind_speed: float,
+    ajuste_planta: float,
+):
+    """Inferencia difusa memoizada; las entradas llegan ya cuantizadas."""
+    return _get_engine().calculate_irrigation(
+        temperature=temperature,
+        soil_humidity=soil_humidity,
+        rain_probability=rain_probability,
+        air_humidity=air_humidity,
+        wind_speed=wind_speed,
+        ajuste_planta=ajuste_planta,
+    )
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_explain(*key: float) -> str:
+    """Explicación en lenguaje natural memoizada con la misma clave que _cached_calc."""
+    t, f, act = _cached_calc(*key)
+    return _get_engine().explain_decision(t, f, act)
 
-_engine = SistemaRiegoDifuso()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_explain_traceable(
+    tiempo: float, frecuencia: float, activaciones: tuple, inputs: tuple
+) -> str:
+    """Explicación trazable memoizada; activaciones e inputs llegan como tuplas de pares."""
+    return _get_engine().explain_decision_traceable(
+        tiempo=tiempo,
+        frecuencia=frecuencia,
+        activaciones=dict(activaciones),
+        inputs=dict(inputs),
+    )
 
 
-def _gauge(title: str, value: float, minv: float, maxv: float, suffix: str = ""):
+@st.cache_data(max_entries=256, show_spinner=False)
+def _gauge_dict(title: str, value: float, minv: float, maxv: float, suffix: str = "") -> dict:
+    """Construye el gauge y lo devuelve ya serializado (dict) para reutilizarlo entre reruns."""
     return go.Figure(
         go.Indicator(
             mode="gauge+number",
@@ -18,15 +88,17 @@ def _gauge(title: str, value: float, minv: float, maxv: float, suffix: str = "")
             gauge={"axis": {"range": [minv, maxv]}},
             number={"suffix": suffix},
         )
-    )
+    ).to_dict()
 
-def _confidence_gauge(confianza: float):
-    """Gauge de nivel de confianza en porcentaje (0..100).
 
-    Espera `confianza` en rango 0..1 y muestra 0..100 con 1 decimal.
-    """
-    pct = float(confianza) * 100.0
-    color = "red" if pct < 40.0 else "yellow" if pct < 70.0 else "green"
+def _gauge(title: str, value: float, minv: float, maxv: float, suffix: str = "") -> dict:
+    # Cuantizar a 2 decimales para aumentar los aciertos de cache
+    return _gauge_dict(title, round(float(value), 2), minv, maxv, suffix)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def _confidence_gauge_dict(pct: float) -> dict:
+    """Gauge de confianza ya serializado para un porcentaje cuantizado."""
+    color = str(_PCT_COLOR[min(1000, max(0, int(round(pct * 10))))])
     return go.Figure(
         go.Indicator(
             mode="gauge+number",
@@ -36,15 +108,142 @@ def _confidence_gauge(confianza: float):
             gauge={
                 'axis': {'range': [0, 100]},
                 'bar': {'color': color},
-                'steps': [
-                    {'range': [0, 40], 'color': "lightcoral"},
-                    {'range': [40, 70], 'color': "lightyellow"},
-                    {'range': [70, 100], 'color': "lightgreen"}
-                ],
+                'steps': _GAUGE_STEPS_CONF,
             },
             number={'valueformat': '.1f', 'suffix': '%'}
         )
+    ).to_dict()
+
+
+def _confidence_gauge(confianza: float) -> dict:
+    """Gauge de nivel de confianza en porcentaje (0..100).
+
+    Espera `confianza` en rango 0..1 y muestra 0..100 con 1 decimal.
+    """
+    # El gauge muestra 1 decimal: cuantizar a esa resolución no cambia lo que se ve
+    return _confidence_gauge_dict(round(float(confianza) * 100.0, 1))
+
+def _split_rules(rules) -> tuple:
+    """Separa pares (regla, activación) en una lista de nombres y un array float64."""
+    if not rules:
+        return [], np.empty(0)
+    keys, vals = zip(*rules)
+    return list(keys), np.asarray(vals, dtype=np.float64)
+
+
+def _build_rules_bundle(act_vals: np.ndarray, k: int = 10) -> tuple:
+    """Top-k de reglas en una sola pasada sobre el array posicional de activaciones.
+
+    Devuelve (nombres, activaciones, etiquetas de impacto), ordenados de mayor a menor
+    activación; a igual activación se conserva el orden de RULE_NAMES. Los textos de las
+    barras no se incluyen: los genera la figura cacheada solo cuando no hay acierto.
+    """
+    idx = np.argsort(-act_vals, kind="stable")[:k]
+    vals = act_vals[idx]
+    return _RULE_KEYS[idx].tolist(), vals, _IMPACT_LABELS[np.digitize(vals, _IMPACT_BINS)]
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _rules_bar_dict(rules: tuple) -> dict:
+    """Barras horizontales del top de reglas (regla, activación), ya serializadas."""
+    keys, vals = _split_rules(rules)
+
+    # Crear visualización de barras horizontal
+    fig = go.Figure(go.Bar(
+        x=vals,
+        y=keys,
+        orientation='h',
+        marker=dict(
+            color=vals,
+            colorscale='Viridis',
+            showscale=True,
+            colorbar=_COLORBAR_SIMPLE,
+        ),
+        text=np.char.mod("%.3f", vals),
+        textposition='auto',
+    ))
+    fig.update_layout(
+        title="Nivel de Activación por Regla Fuzzy",
+        xaxis_title="Activación (0-1)",
+        yaxis_title="Regla",
+        height=400,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig.to_dict()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _trace_rules_dict(rules: tuple) -> dict:
+    """Barras del top 8 de reglas para la trazabilidad, ya serializadas."""
+    keys, vals = _split_rules(rules)
+
+    # Crear gráfico de barras horizontales
+    fig = go.Figure()
+
+    # Barras principales
+    fig.add_trace(go.Bar(
+        y=[f"{regla} ({act:.2f})" for regla, act in zip(keys, vals)],
+        x=vals,
+        orientation='h',
+        marker=dict(
+            color=vals,
+            colorscale=_BAR_COLORSCALE,
+            showscale=True,
+            colorbar=_COLORBAR_ACT,
+        ),
+        text=np.char.mod("%.3f", vals),
+        textposition='outside',
+        hovertemplate="<b>%{y}</b><br>Activación: %{x:.3f}<extra></extra>"
+    ))
+
+    # Configurar layout
+    fig.update_layout(
+        title="Top 8 Reglas Más Activas",
+        xaxis=_TRACE_XAXIS,
+        yaxis=_TRACE_YAXIS,
+        height=max(400, len(rules) * 40),
+        margin=_TRACE_MARGIN,
+        template="plotly_white"
     )
+    return fig.to_dict()
+
+
+def peak_weighted_confidence(activations: dict, w_max: float = 0.7, alpha: float = 0.85) -> float:
+    """
+    Calcula confianza basada en activaciones de reglas fuzzy.
+    - w_max: peso para el máximo (default 0.7 = 70% peso al pico)
+    - alpha: exponente que controla penalización (< 1 = menos estricto)
+
+    Valores típicos de confianza:
+    - >0.65: Alta confianza (condiciones claras)
+    - 0.45-0.65: Confianza media (condiciones normales)
+    - <0.45: Baja confianza (condiciones ambiguas)
+    """
+    if not activations:
+        return 0.75  # Default alto si no hay datos
+
+    # Un único array para las tres reducciones (máximo, media y conteo)
+    vals = np.fromiter(activations.values(), dtype=np.float64, count=len(activations))
+    max_a = float(vals.max())
+    mean_a = float(vals.mean())
+
+    # Fórmula ajustada: más tolerante con activaciones moderadas
+    # El alpha < 1 hace que valores medios (0.4-0.6) no se penalicen tanto
+    conf = w_max * (max_a ** alpha) + (1.0 - w_max) * (mean_a ** alpha)
+
+    # Boost adicional si hay múltiples reglas con activación razonable (>0.3)
+    if int((vals > 0.3).sum()) >= 3:
+        conf = min(1.0, conf * 1.15)  # Bonus del 15% si hay consenso
+
+    return min(1.0, float(conf))
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_confidence(*key: float) -> float:
+    """Confianza peak-weighted memoizada con la misma clave que _cached_calc."""
+    return peak_weighted_confidence(_cached_calc(*key)[2], w_max=0.7, alpha=0.85)
+
 
 def render_dashboard() -> None:
     st.title("🌊 Calculadora de Riego Inteligente")
@@ -67,10 +266,8 @@ def render_dashboard() -> None:
             st.session_state.pop('ws_updated', None)
             st.session_state.pop('ws_updated_ts', None)
     except Exception:
-        # No mostramos un mensaje UI cuando el selector falla; solo limpiamos payload temporal
-        st.session_state.pop('ws_last_payload', None)
-        st.session_state.pop('ws_last_dept', None)
-        st.session_state.pop('ws_last_latlon', None)
+        # No mostramos un mensaje UI cuando el selector falla: la calculadora sigue en modo manual
+        pass
 
     with st.expander("¿Qué es Lógica Difusa?", expanded=False):
         st.write(
@@ -96,16 +293,11 @@ def render_dashboard() -> None:
     })
 
     # Inicializar session_state SOLO si no existen las keys (evita el warning de Streamlit)
-    if 'calc_temp' not in st.session_state:
-        st.session_state['calc_temp'] = defaults['temperature']
-    if 'calc_soil' not in st.session_state:
-        st.session_state['calc_soil'] = defaults['soil_humidity']
-    if 'calc_rain' not in st.session_state:
-        st.session_state['calc_rain'] = defaults['rain_probability']
-    if 'calc_hum' not in st.session_state:
-        st.session_state['calc_hum'] = defaults['air_humidity']
-    if 'calc_wind' not in st.session_state:
-        st.session_state['calc_wind'] = defaults['wind_speed']
+    st.session_state.setdefault('calc_temp', defaults['temperature'])
+    st.session_state.setdefault('calc_soil', defaults['soil_humidity'])
+    st.session_state.setdefault('calc_rain', defaults['rain_probability'])
+    st.session_state.setdefault('calc_hum', defaults['air_humidity'])
+    st.session_state.setdefault('calc_wind', defaults['wind_speed'])
 
     cols = st.columns(3)
     with cols[0]:
@@ -147,63 +339,49 @@ def render_dashboard() -> None:
     do_calc = st.button("Calcular Riego", type="primary") or auto
 
     if do_calc:
-        try:
-            validate_inputs(temperatura, humedad_suelo, prob_lluvia, humedad_ambiental, viento)
-            logger.info(f"Irrigation calculation initiated for plant {planta} with inputs: "
-                        f"temp={temperatura}, soil_humidity={humedad_suelo}, rain_prob={prob_lluvia}, "
-                        f"air_humidity={humedad_ambiental}, wind={viento}")
-
-            with st.spinner("Calculando decisión de riego..."):
-                t, f, act = _engine.calculate_irrigation(
-                    temperature=temperatura,
-                    soil_humidity=humedad_suelo,
-                    rain_probability=prob_lluvia,
-                    air_humidity=humedad_ambiental,
-                    wind_speed=viento,
-                    ajuste_planta=ajuste,
-                )
-                expl = _engine.explain_decision(t, f, act)
-                logger.info(f"Irrigation decision for {planta}: time={t:.2f} min, frequency={f:.2f} x/day")
-        except Exception as e:
-            logger.error(f"Error during irrigation calculation: {e}")
-            st.error(f"❌ Error: {e}")
-            st.info("💡 Verifica que todos los valores estén en los rangos correctos.")
-            return
-
-        # Calcular confianza usando método peak-weighted (da más peso al pico de activación)
-        def peak_weighted_confidence(activations: dict, w_max: float = 0.7, alpha: float = 0.85) -> float:
-            """
-            Calcula confianza basada en activaciones de reglas fuzzy.
-            - w_max: peso para el máximo (default 0.7 = 70% peso al pico)
-            - alpha: exponente que controla penalización (< 1 = menos estricto)
-            
-            Valores típicos de confianza:
-            - >0.65: Alta confianza (condiciones claras)
-            - 0.45-0.65: Confianza media (condiciones normales)
-            - <0.45: Baja confianza (condiciones ambiguas)
-            """
-            if not activations:
-                return 0.75  # Default alto si no hay datos
-            
-            vals = list(activations.values())
-            if not vals:
-                return 0.75
-            
-            max_a = max(vals)
-            mean_a = sum(vals) / len(vals)
-            
-            # Fórmula ajustada: más tolerante con activaciones moderadas
-            # El alpha < 1 hace que valores medios (0.4-0.6) no se penalicen tanto
-            conf = w_max * (max_a ** alpha) + (1.0 - w_max) * (mean_a ** alpha)
-            
-            # Boost adicional si hay múltiples reglas con activación razonable (>0.3)
-            strong_rules = sum(1 for v in vals if v > 0.3)
-            if strong_rules >= 3:
-                conf = min(1.0, conf * 1.15)  # Bonus del 15% si hay consenso
-            
-            return min(1.0, float(conf))
-
-        confianza = peak_weighted_confidence(act, w_max=0.7, alpha=0.85)
+        # Firma exacta de las entradas: si no cambió desde el último cálculo de esta
+        # sesión (p. ej. reruns en modo automático) se reutiliza el resultado completo
+        calc_sig = (temperatura, humedad_suelo, prob_lluvia, humedad_ambiental, viento, planta)
+        repetido = st.session_state.get("last_calc_key") == calc_sig
+        if repetido:
+            calc_key, t, f, act, expl, confianza = st.session_state["last_calc_result"]
+        else:
+            try:
+                validate_inputs(temperatura, humedad_suelo, prob_lluvia, humedad_ambiental, viento)
+                logger.info("Irrigation calculation initiated for plant %s with inputs: "
+                            "temp=%s, soil_humidity=%s, rain_prob=%s, air_humidity=%s, wind=%s",
+                            planta, temperatura, humedad_suelo, prob_lluvia, humedad_ambiental, viento)
+
+                with st.spinner("Calculando decisión de riego..."):
+                    # Misma granularidad que la clave de cache interna del motor
+                    calc_key = (
+                        round(temperatura, 1),
+                        round(humedad_suelo, 1),
+                        round(prob_lluvia, 1),
+                        round(humedad_ambiental, 1),
+                        round(viento, 1),
+                        round(ajuste, 2),
+                    )
+                    t, f, act = _cached_calc(*calc_key)
+                    expl = _cached_explain(*calc_key)
+                    logger.info("Irrigation decision for %s: time=%.2f min, frequency=%.2f x/day", planta, t, f)
+            except Exception as e:
+                logger.error("Error during irrigation calculation: %s", e)
+                st.error(f"❌ Error: {e}")
+                st.info("💡 Verifica que todos los valores estén en los rangos correctos.")
+                return
+
+            # Calcular confianza usando método peak-weighted (da más peso al pico de activación)
+            confianza = _cached_confidence(*calc_key)
+            st.session_state["last_calc_key"] = calc_sig
+            st.session_state["last_calc_result"] = (calc_key, t, f, act, expl, confianza)
+
+        # Activaciones como array posicional (RULE_NAMES) y reglas más activas:
+        # se calculan una vez y se reutilizan en trazabilidad y detalle
+        act_vals = activations_to_array(act)
+        # Sin activaciones (fallback del motor) no hay reglas que mostrar
+        top_keys, top_vals, top_impact = _build_rules_bundle(act_vals, 10 if act else 0)
+        sorted_rules = list(zip(top_keys, top_vals.tolist()))
 
         # Mostrar alerta solo si la confianza es REALMENTE baja
         if confianza < 0.45:
@@ -256,7 +434,8 @@ def render_dashboard() -> None:
             "frecuencia": round(f, 2),
             "confianza": round(confianza, 2),
         }
-        save_history(record)
+        if not repetido:
+            queue_history(record)
 
         # Guardar configuración para compartir con visualizaciones
         st.session_state['calculadora_current'] = {
@@ -271,17 +450,21 @@ def render_dashboard() -> None:
         # Ajuste por planta (educativo)
         st.markdown("---")
         st.subheader("🌱 Ajuste Personalizado por Planta")
-        reco = get_recomendacion(
-            planta,
-            {
-                "temperatura": temperatura,
-                "humedad_suelo": humedad_suelo,
-                "prob_lluvia": prob_lluvia,
-                "humedad_ambiente": humedad_ambiental,
-                "velocidad_viento": viento,
-            },
-            {"tiempo_min": t, "frecuencia": f},
-        )
+        # get_recomendacion también escribe historico.jsonl: solo con entradas nuevas
+        reco = st.session_state.get("last_calc_reco") if repetido else None
+        if reco is None:
+            reco = get_recomendacion(
+                planta,
+                {
+                    "temperatura": temperatura,
+                    "humedad_suelo": humedad_suelo,
+                    "prob_lluvia": prob_lluvia,
+                    "humedad_ambiente": humedad_ambiental,
+                    "velocidad_viento": viento,
+                },
+                {"tiempo_min": t, "frecuencia": f},
+            )
+            st.session_state["last_calc_reco"] = reco
 
         col_a, col_b = st.columns(2)
         with col_a:
@@ -319,69 +502,60 @@ def render_dashboard() -> None:
                 'wind_speed': viento
             },
             outputs={'tiempo': t, 'frecuencia': f},
-            activaciones=act
+            activaciones=act,
+            top_rules=sorted_rules[:8],
+            act_vals=act_vals,
         )
 
         # Reglas más activas con visualización mejorada
         with st.expander("🔍 Ver Reglas Fuzzy Activadas (Top 10)"):
-            sorted_rules = sorted(act.items(), key=lambda kv: kv[1], reverse=True)[:10]
-
-            # Crear visualización de barras horizontal
-            fig = go.Figure(go.Bar(
-                x=[v for _, v in sorted_rules],
-                y=[k for k, _ in sorted_rules],
-                orientation='h',
-                marker=dict(
-                    color=[v for _, v in sorted_rules],
-                    colorscale='Viridis',
-                    showscale=True,
-                    colorbar=dict(title="Activación")
-                ),
-                text=[f"{v:.3f}" for _, v in sorted_rules],
-                textposition='auto',
-            ))
-            fig.update_layout(
-                title="Nivel de Activación por Regla Fuzzy",
-                xaxis_title="Activación (0-1)",
-                yaxis_title="Regla",
-                height=400,
-                showlegend=False,
-                yaxis={'categoryorder': 'total ascending'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            # Figura cacheada por conjunto de reglas (el expander no la difiere)
+            st.plotly_chart(_rules_bar_dict(tuple(sorted_rules)), use_container_width=True)
 
-            # Tabla adicional con detalle
+            # Tabla adicional con detalle (mismos arrays que el gráfico)
             st.table({
-                "Regla": [k for k, _ in sorted_rules],
-                "Activación": [round(v, 3) for _, v in sorted_rules],
-                "Impacto": ["Bajo" if v < 0.3 else "Medio" if v < 0.7 else "Alto" for _, v in sorted_rules]
+                "Regla": top_keys,
+                "Activación": top_vals.round(3).tolist(),
+                "Impacto": top_impact.tolist()
             })
 
         # Botón para limpiar cache (útil para debugging)
         if st.button("🔄 Limpiar Cache del Motor", help="Útil si cambias el código del motor fuzzy"):
-            if hasattr(_engine, '_cache'):
-                _engine._cache.clear()
-                st.success("💾 Cache limpiado exitosamente")
-            else:
-                st.info("No hay cache para limpiar")
-
-
-def show_traceability_explanation(inputs: dict, outputs: dict, activaciones: dict) -> None:
+            _get_engine().clear_cache()
+            # Los resultados memoizados por Streamlit también provienen del motor
+            _cached_calc.clear()
+            _cached_explain.clear()
+            _cached_confidence.clear()
+            _cached_explain_traceable.clear()
+            st.session_state.pop("last_calc_key", None)
+            st.success("💾 Cache limpiado exitosamente")
+
+
+def show_traceability_explanation(
+    inputs: dict,
+    outputs: dict,
+    activaciones: dict,
+    top_rules: list | None = None,
+    act_vals: np.ndarray | None = None,
+) -> None:
     """Componente visual de trazabilidad completa de la decisión del sistema.
 
     Args:
         inputs: Diccionario con valores de entrada (temperature, soil_humidity, etc.)
         outputs: Diccionario con valores de salida (tiempo, frecuencia)
         activaciones: Diccionario con activación de reglas fuzzy
+        top_rules: Top 8 (regla, activación) ya ordenado; si falta se calcula aquí
+        act_vals: Activaciones en orden de RULE_NAMES; si falta se convierten aquí
     """
     with st.expander("🔍 TRAZABILIDAD COMPLETA - ¿Por qué decidió así?", expanded=False):
 
-        # Generar explicación trazable completa
-        explicacion_completa = _engine.explain_decision_traceable(
-            tiempo=outputs['tiempo'],
-            frecuencia=outputs['frecuencia'],
-            activaciones=activaciones,
-            inputs=inputs
+        # Generar explicación trazable completa (el expander ejecuta su cuerpo aunque esté
+        # plegado, así que se memoiza en lugar de reconstruir el Markdown en cada rerun)
+        explicacion_completa = _cached_explain_traceable(
+            outputs['tiempo'],
+            outputs['frecuencia'],
+            tuple(activaciones.items()),
+            tuple(inputs.items()),
         )
 
         # Mostrar explicación en formato Markdown
@@ -392,63 +566,22 @@ def show_traceability_explanation(inputs: dict, outputs: dict, activaciones: dic
         st.markdown("### 📊 Visualización de Reglas Activas")
 
         # Preparar datos para el gráfico
-        top_rules = sorted(activaciones.items(), key=lambda x: x[1], reverse=True)[:8]
+        if top_rules is None:
+            top_rules = nlargest(8, activaciones.items(), key=itemgetter(1))
 
         if top_rules:
-            # Crear gráfico de barras horizontales
-            fig = go.Figure()
-
-            # Barras principales
-            fig.add_trace(go.Bar(
-                y=[f"{regla} ({act:.2f})" for regla, act in top_rules],
-                x=[act for regla, act in top_rules],
-                orientation='h',
-                marker=dict(
-                    color=[act for regla, act in top_rules],
-                    colorscale=[
-                        [0.0, '#e3f2fd'],  # Azul muy claro
-                        [0.3, '#2196f3'],  # Azul
-                        [0.7, '#ff9800'],  # Naranja
-                        [1.0, '#f44336']   # Rojo
-                    ],
-                    showscale=True,
-                    colorbar=dict(
-                        title="Activación",
-                        titleside="right",
-                        tickformat=".2f"
-                    )
-                ),
-                text=[f"{act:.3f}" for regla, act in top_rules],
-                textposition='outside',
-                hovertemplate="<b>%{y}</b><br>Activación: %{x:.3f}<extra></extra>"
-            ))
-
-            # Configurar layout
-            fig.update_layout(
-                title="Top 8 Reglas Más Activas",
-                xaxis=dict(
-                    title="Nivel de Activación (0-1)",
-                    range=[0, 1.1],
-                    tickformat=".2f"
-                ),
-                yaxis=dict(
-                    title="Regla Fuzzy",
-                    autorange="reversed"  # Para que la más activa aparezca arriba
-                ),
-                height=max(400, len(top_rules) * 40),
-                margin=dict(l=200, r=100, t=50, b=50),
-                template="plotly_white"
-            )
+            st.plotly_chart(_trace_rules_dict(tuple(top_rules)), use_container_width=True)
 
-            st.plotly_chart(fig, use_container_width=True)
+            # Estadísticas en una sola pasada sobre las activaciones
+            vals = act_vals if act_vals is not None else activations_to_array(activaciones)
 
             # Información adicional
             st.markdown("---")
             col1, col2, col3 = st.columns(3)
 
             with col1:
-                max_activacion = max(activaciones.values())
-                regla_max = max(activaciones.items(), key=lambda x: x[1])[0]
+                # top_rules ya viene ordenado: la primera es la más activa
+                regla_max, max_activacion = top_rules[0]
                 st.metric(
                     "🔥 Regla Más Activa",
                     regla_max,
@@ -456,17 +589,16 @@ def show_traceability_explanation(inputs: dict, outputs: dict, activaciones: dic
                 )
 
             with col2:
-                reglas_activas = sum(1 for act in activaciones.values() if act > 0.1)
+                reglas_activas = int((vals > 0.1).sum())
                 st.metric(
                     "📋 Reglas Activas",
-                    f"{reglas_activas}/33",
-                    f"{reglas_activas/33*100:.0f}%"
+                    f"{reglas_activas}/{len(RULE_NAMES)}",
+                    f"{reglas_activas/len(RULE_NAMES)*100:.0f}%"
                 )
 
             with col3:
                 # Calcular diversidad de activación
-                valores = list(activaciones.values())
-                diversidad = len([v for v in valores if v > 0.2]) / len(valores)
+                diversidad = float((vals > 0.2).mean())
                 st.metric(
                     "🎭 Diversidad",
                     f"{diversidad:.1f}",
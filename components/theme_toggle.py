@@ -3,10 +3,59 @@ Componente de Cambio de Tema
 Permite cambiar entre modo claro y oscuro dinámicamente
 """
 
+import os
+import re
+from types import MappingProxyType
+
 try:
     import streamlit as st
+    import streamlit.components.v1 as components
 except ImportError:
     st = None
+    components = None
+
+__all__ = ['ThemeToggle']
+
+# Hojas de estilo servidas por Streamlit en app/static/ (server.enableStaticServing)
+_STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+_THEMES = ('dark', 'light')
+_STATIC_CSS = os.path.join(_STATIC_DIR, 'theme.css')
+
+# Menú "⋮" de Streamlit (misma configuración para ambos temas)
+_MENU_ITEMS = {
+    'Get Help': 'https://www.streamlit.io/',
+    'Report a bug': "https://github.com",
+    'About': "# Sistema Experto de Riego Inteligente"
+}
+
+# Paletas por tema: constantes de solo lectura, compartidas en lugar de reconstruirse por llamada
+_COLORS = {
+    'dark': MappingProxyType({
+        'bg': '#0E1117',
+        'secondary_bg': '#262730',
+        'text': '#FAFAFA',
+        'primary': '#FF4B4B',
+        'accent': '#29b5e8',
+        'success': '#06A77D',
+        'warning': '#F39C12',
+        'danger': '#E74C3C',
+        'card_bg': '#262730',
+        'border': '#404040'
+    }),
+    # Tema claro con buena legibilidad
+    'light': MappingProxyType({
+        'bg': '#FFFFFF',
+        'secondary_bg': '#F8F9FA',
+        'text': '#2D3142',
+        'primary': '#FF4B4B',
+        'accent': '#2E86AB',
+        'success': '#28A745',
+        'warning': '#FFC107',
+        'danger': '#DC3545',
+        'card_bg': 'white',
+        'border': '#E9ECEF'
+    }),
+}
 
 
 class ThemeToggle:
@@ -16,72 +65,35 @@ class ThemeToggle:
     def initialize_theme():
         """Inicializa el estado del tema"""
         if 'theme' not in st.session_state:
-            st.session_state.theme = 'dark'
+            # El tema elegido viaja en la URL (?theme=light) y sobrevive a recargar la página
+            theme = st.query_params.get('theme', 'dark')
+            st.session_state.theme = theme if theme in _THEMES else 'dark'
 
-        if 'theme_initialized' not in st.session_state:
-            st.session_state.theme_initialized = False
+        st.session_state.setdefault('theme_initialized', False)
 
     @staticmethod
     def setup_page_config():
         """Configura Streamlit según el tema actual"""
         if not st.session_state.theme_initialized:
-            # Solo configuramos una vez por sesión
-            if st.session_state.theme == 'dark':
-                st.set_page_config(
-                    page_title="Sistema Experto de Riego",
-                    page_icon="💧",
-                    layout="wide",
-                    initial_sidebar_state="expanded",
-                    menu_items={
-                        'Get Help': 'https://www.streamlit.io/',
-                        'Report a bug': "https://github.com",
-                        'About': "# Sistema Experto de Riego Inteligente"
-                    }
-                )
-            else:
-                st.set_page_config(
-                    page_title="Sistema Experto de Riego",
-                    page_icon="💧",
-                    layout="wide",
-                    initial_sidebar_state="expanded",
-                    menu_items={
-                        'Get Help': 'https://www.streamlit.io/',
-                        'Report a bug': "https://github.com",
-                        'About': "# Sistema Experto de Riego Inteligente"
-                    }
-                )
+            # Solo configuramos una vez por sesión (la configuración no depende del tema)
+            st.set_page_config(
+                page_title="Sistema Experto de Riego",
+                page_icon="💧",
+                layout="wide",
+                initial_sidebar_state="expanded",
+                menu_items=_MENU_ITEMS,
+            )
             st.session_state.theme_initialized = True
 
     @staticmethod
     def get_theme_colors():
-        """Retorna colores según el tema actual"""
-        if st.session_state.theme == 'dark':
-            return {
-                'bg': '#0E1117',
-                'secondary_bg': '#262730',
-                'text': '#FAFAFA',
-                'primary': '#FF4B4B',
-                'accent': '#29b5e8',
-                'success': '#06A77D',
-                'warning': '#F39C12',
-                'danger': '#E74C3C',
-                'card_bg': '#262730',
-                'border': '#404040'
-            }
-        else:
-            # Tema claro con buena legibilidad
-            return {
-                'bg': '#FFFFFF',
-                'secondary_bg': '#F8F9FA',
-                'text': '#2D3142',
-                'primary': '#FF4B4B',
-                'accent': '#2E86AB',
-                'success': '#28A745',
-                'warning': '#FFC107',
-                'danger': '#DC3545',
-                'card_bg': 'white',
-                'border': '#E9ECEF'
-            }
+        """Retorna colores según el tema actual (mapeo de solo lectura)"""
+        return _COLORS[st.session_state.theme]
+
+    @staticmethod
+    def _colors_for(theme):
+        """Retorna la paleta de colores de un tema concreto"""
+        return _COLORS['dark' if theme == 'dark' else 'light']
 
     @staticmethod
     def render_theme_toggle():
@@ -97,19 +109,15 @@ class ThemeToggle:
 
         with col2:
             current_label = f"{icon_left} {'Oscuro' if st.session_state.theme == 'dark' else 'Claro'} {icon_right}"
-            if st.button(
+            # El callback cambia el tema antes del rerun que dispara el propio clic, así que
+            # inject_theme_css ya fija el data-theme nuevo sin necesidad de un st.rerun() extra
+            st.button(
                 current_label,
                 key="theme_toggle_button",
                 help=f"Cambiar a modo {'claro' if st.session_state.theme == 'dark' else 'oscuro'}",
-                use_container_width=True
-            ):
-                # Cambiar tema
-                st.session_state.theme = 'light' if st.session_state.theme == 'dark' else 'dark'
-                # Prepare for page restoration
-                if 'current_page' in st.session_state:
-                    st.session_state.page_restore = st.session_state.current_page
-                # Forzar rerun para aplicar cambio CSS inmediatamente
-                st.rerun()
+                use_container_width=True,
+                on_click=ThemeToggle._toggle_theme,
+            )
 
         # Mostrar estado actual
         current_theme = "Oscuro 🌙" if st.session_state.theme == 'dark' else "Claro ☀️"
@@ -117,15 +125,39 @@ class ThemeToggle:
 
         return st.session_state.theme
 
+    @staticmethod
+    def _toggle_theme():
+        """Callback del botón de tema: alterna entre oscuro y claro"""
+        st.session_state.theme = 'light' if st.session_state.theme == 'dark' else 'dark'
+        # Persistir la elección en la URL; escribir query_params no provoca otro rerun
+        st.query_params['theme'] = st.session_state.theme
+
     @staticmethod
     def inject_theme_css():
-        """Inyecta CSS adaptativo según el tema"""
-        colors = ThemeToggle.get_theme_colors()
+        """Inyecta CSS adaptativo según el tema
+
+        La hoja de estilos es idéntica para ambos temas (con el servidor de estáticos activo
+        solo se envía un <link> que el navegador mantiene parseado). El tema se aplica
+        fijando data-theme en <html>, lo que solo recalcula las variables CSS.
+        """
+        if _STATIC_CSS_READY and st.get_option("server.enableStaticServing"):
+            st.markdown(ThemeToggle._CSS_LINK, unsafe_allow_html=True)
+        else:
+            st.markdown(ThemeToggle._CSS_BLOCK, unsafe_allow_html=True)
+        components.html(ThemeToggle._THEME_SCRIPT[st.session_state.theme], height=0)
+
+    @staticmethod
+    def _build_palette_rules():
+        """Variables CSS de ambas paletas, seleccionadas por el atributo data-theme de <html>.
 
-        css = f"""
-        <style>
-        /* CSS dinámico según tema */
-        :root {{
+        :root lleva la paleta oscura para que la página ya salga con el tema por defecto
+        antes de que el script fije el atributo.
+        """
+        blocks = []
+        for theme, selector in (('dark', ':root, [data-theme="dark"]'), ('light', '[data-theme="light"]')):
+            colors = ThemeToggle._colors_for(theme)
+            blocks.append(f"""
+        {selector} {{
             --theme-bg: {colors['bg']};
             --theme-secondary-bg: {colors['secondary_bg']};
             --theme-text: {colors['text']};
@@ -136,151 +168,168 @@ class ThemeToggle:
             --theme-danger: {colors['danger']};
             --theme-card-bg: {colors['card_bg']};
             --theme-border: {colors['border']};
+            --theme-shadow: {'rgba(0,0,0,0.3)' if theme == 'dark' else 'rgba(0,0,0,0.1)'};
         }}
+""")
+        return ''.join(blocks)
 
+    @staticmethod
+    def _build_theme_rules():
+        """Hoja de estilos completa (ambas paletas + reglas), sin envoltorio <style>.
+
+        Es la misma para los dos temas: cambiar de tema solo cambia el atributo data-theme,
+        no el texto de las reglas. Minificada, también se escribe en static/theme.css.
+        """
+        return "\n        /* CSS dinámico según tema */" + ThemeToggle._build_palette_rules() + _BASE_RULES
+
+    @staticmethod
+    def get_plotly_template():
+        """Template de Plotly según el tema actual"""
+        if st.session_state.theme == 'dark':
+            return "plotly_dark"
+        else:
+            return "plotly_white"
+
+    @staticmethod
+    def update_visualization_config(config):
+        """Actualiza la configuración de visualización según el tema"""
+        colors = ThemeToggle.get_theme_colors()
+
+        # Actualizar colores de la configuración
+        config.LAYOUT_TEMPLATE = ThemeToggle.get_plotly_template()
+        # La paleta es de solo lectura: se copian sus valores a la configuración
+        config.COLORS.update(colors)
+        config.FONT_FAMILY = 'Segoe UI, sans-serif'
+
+        return config
+
+
+# Reglas comunes a ambos temas: solo usan variables CSS (var(--theme-*))
+_BASE_RULES = """
         /* Aplica variables CSS dinámicamente */
-        .main {{
+        .main {
             background-color: var(--theme-bg) !important;
             color: var(--theme-text) !important;
-        }}
+        }
 
         /* Sidebar */
-        [data-testid="stSidebar"] {{
+        [data-testid="stSidebar"] {
             background-color: var(--theme-secondary-bg) !important;
-        }}
+        }
 
         /* Streamlit Header (toolbar) */
-        [data-testid="stHeader"] {{
+        [data-testid="stHeader"] {
             background-color: var(--theme-bg) !important;
             border-bottom: 1px solid var(--theme-border) !important;
-        }}
-
-        [data-testid="stHeader"] button, [data-testid="stHeader"] svg {{
+        }
+
+        /* Color de texto del tema: un solo grupo de selectores en lugar de una regla por elemento.
+           Solo etiquetas semánticas (los div heredan el color de .main); las recomendaciones
+           mantienen su color negro por la regla div.recommendation-card *, más específica */
+        p, span, label,
+        h1, h2, h3, h4, h5, h6,
+        .stMarkdown, .stText,
+        [data-testid="stMetricLabel"],
+        [data-testid="stSlider"],
+        [data-testid="stHeader"] button, [data-testid="stHeader"] svg,
+        .st-emotion-cache-1v0mbdj, .st-emotion-cache-1r6m2br {
             color: var(--theme-text) !important;
-        }}
-
-        /* Texto general - excluir recomendaciones que tienen color negro forzado */
-        p, span, div:not([class*="st-"]):not(.recommendation-card), label {{
-            color: var(--theme-text) !important;
-        }}
-
-        /* Headers */
-        h1, h2, h3, h4, h5, h6 {{
-            color: var(--theme-text) !important;
-        }}
+        }
 
         /* TEXTO EN NEGRO PARA RECOMENDACIONES - FORZADO */
-        div.recommendation-card * {{
+        div.recommendation-card * {
             color: #2C3E50 !important;
-        }}
-        .recommendation-card {{
+        }
+        .recommendation-card {
             color: #2C3E50 !important;
-        }}
+        }
 
         /* Tabs */
-        [data-testid="stTabs"] [data-testid="stTab"] {{
+        [data-testid="stTabs"] [data-testid="stTab"] {
             background-color: var(--theme-secondary-bg) !important;
             color: var(--theme-text) !important;
-        }}
+        }
 
         /* Métricas */
-        [data-testid="stMetricValue"] {{
+        [data-testid="stMetricValue"] {
             color: var(--theme-primary) !important;
-        }}
-
-        [data-testid="stMetricLabel"] {{
-            color: var(--theme-text) !important;
-        }}
+        }
 
         /* Selectores */
-        [data-testid="stSelectbox"] button {{
+        [data-testid="stSelectbox"] button {
             background-color: var(--theme-card-bg) !important;
             color: var(--theme-text) !important;
             border-color: var(--theme-border) !important;
-        }}
-
-        /* Sliders */
-        [data-testid="stSlider"] {{
-            color: var(--theme-text) !important;
-        }}
+        }
 
         /* Botones */
-        [data-testid="stButton"] button {{
+        [data-testid="stButton"] button {
             background-color: var(--theme-primary) !important;
             color: white !important;
             border: none !important;
-        }}
+        }
 
         /* Dataframe */
-        [data-testid="stDataframe"] {{
+        [data-testid="stDataframe"] {
             background-color: var(--theme-card-bg) !important;
-        }}
+        }
 
         /* Cards personalizados */
-        .stCard {{
+        .stCard {
             background-color: var(--theme-card-bg) !important;
             border: 1px solid var(--theme-border) !important;
             color: var(--theme-text) !important;
-        }}
+        }
 
         /* Expander */
-        [data-testid="stExpander"] summary {{
+        [data-testid="stExpander"] summary {
             color: var(--theme-text) !important;
             background-color: var(--theme-secondary-bg) !important;
-        }}
+        }
 
 
 
-        .plotly-notifier {{
+        .plotly-notifier {
             fill: var(--theme-text) !important;
-        }}
+        }
 
         /* Específicos del sistema */
-        .card {{
+        .card {
             background-color: var(--theme-card-bg) !important;
             border: 1px solid var(--theme-border) !important;
             color: var(--theme-text) !important;
-            box-shadow: 0 2px 8px {'rgba(0,0,0,0.3)' if colors['bg'] == '#0E1117' else 'rgba(0,0,0,0.1)'} !important;
-        }}
+            box-shadow: 0 2px 8px var(--theme-shadow) !important;
+        }
 
-        .stMetric {{
+        .stMetric {
             background-color: var(--theme-card-bg) !important;
             border: 1px solid var(--theme-border) !important;
             border-radius: 8px !important;
             padding: 15px !important;
-        }}
-
-        /* Asegurar legibilidad en modo oscuro */
-        .stMarkdown, .stText {{
-            color: var(--theme-text) !important;
-        }}
-
-        .st-emotion-cache-1v0mbdj, .st-emotion-cache-1r6m2br {{
-            color: var(--theme-text) !important;
-        }}
+        }
 
         /* RESPONSIVE DESIGN */
         /* Tablets y mobile */
-        @media (max-width: 768px) {{
-            .main .block-container {{
+        @media (max-width: 768px) {
+            .main .block-container {
                 padding: 0rem 1rem 2rem 1rem !important;
-            }}
-            [data-testid="stSidebar"] {{
+            }
+            [data-testid="stSidebar"] {
                 width: 200px !important;
-            }}
-            [data-testid="stMetricValue"] {{
+            }
+            [data-testid="stMetricValue"] {
                 font-size: 20px !important;
-            }}
-            .row-widget.stHorizontalBlock {{
+            }
+            .row-widget.stHorizontalBlock {
                 flex-direction: column !important;
-            }}
-            .stTabs [data-baseweb="tab-list"] {{
+            }
+            .stTabs [data-baseweb="tab-list"] {
                 display: grid !important;
                 grid-template-columns: repeat(2, 1fr) !important;
                 gap: 6px !important;
                 overflow: hidden !important;
-            }}
-            .stTabs [data-baseweb="tab"] {{
+            }
+            .stTabs [data-baseweb="tab"] {
                 font-size: 11px !important;
                 padding: 8px 4px !important;
                 text-align: center !important;
@@ -291,20 +340,20 @@ class ThemeToggle:
                 align-items: center !important;
                 justify-content: center !important;
                 border-radius: 6px !important;
-            }}
+            }
             /* Asegurar que las métricas en columnas se apilen */
-            [data-baseweb="card"] {{
+            [data-baseweb="card"] {
                 margin-bottom: 1rem !important;
-            }}
-        }}
+            }
+        }
 
         /* Móviles */
-        @media (max-width: 480px) {{
-            .main .block-container {{
+        @media (max-width: 480px) {
+            .main .block-container {
                 padding: 1rem !important;
                 max-width: 100% !important;
-            }}
-            [data-testid="stSidebar"] {{
+            }
+            [data-testid="stSidebar"] {
                 position: fixed !important;
                 left: -100% !important;
                 top: 0 !important;
@@ -312,13 +361,13 @@ class ThemeToggle:
                 width: 280px !important;
                 z-index: 999 !important;
                 transition: left 0.3s ease !important;
-            }}
+            }
             /* Show sidebar when expanded */
-            [data-testid="stSidebar"][aria-expanded="true"] {{
+            [data-testid="stSidebar"][aria-expanded="true"] {
                 left: 0 !important;
-            }}
+            }
             /* Ensure hamburger menu is visible */
-            [data-testid="stSidebarNav"] {{
+            [data-testid="stSidebarNav"] {
                 display: block !important;
                 opacity: 1 !important;
                 position: fixed !important;
@@ -327,95 +376,105 @@ class ThemeToggle:
                 z-index: 1000 !important;
                 background: var(--theme-primary) !important;
                 border-radius: 4px !important;
-            }}
-            .stButton button {{
+            }
+            .stButton button {
                 padding: 12px 16px !important;
                 min-height: 44px !important;
                 font-size: 16px !important;
                 width: 100% !important;
-            }}
-            [data-testid="stSlider"] {{
+            }
+            [data-testid="stSlider"] {
                 min-height: 44px !important;
-            }}
-            .stMetric {{
+            }
+            .stMetric {
                 text-align: center !important;
                 padding: 10px !important;
                 margin: 5px 0 !important;
-            }}
-            .stTabs [data-baseweb="tab"] {{
+            }
+            .stTabs [data-baseweb="tab"] {
                 padding: 8px 6px !important;
                 font-size: 12px !important;
                 max-width: 85px !important;
                 margin: 0 2px !important;
-            }}
+            }
             /* Reducir espacio en métricas para móviles */
-            [data-baseweb="card"] {{
+            [data-baseweb="card"] {
                 padding: 8px !important;
                 margin: 4px 0 !important;
-            }}
+            }
             /* Imágenes responsive */
-            img {{
+            img {
                 max-width: 100% !important;
                 height: auto !important;
-            }}
+            }
             /* Gráficos más pequeños */
-            .js-plotly-plot {{
+            .js-plotly-plot {
                 height: 250px !important;
                 max-width: 100% !important;
-            }}
+            }
             /* Texto más legible */
-            h1 {{
+            h1 {
                 font-size: 1.5rem !important;
-            }}
-            h2 {{
+            }
+            h2 {
                 font-size: 1.3rem !important;
-            }}
-        }}
+            }
+        }
 
         /* Tablets */
-        @media (min-width: 769px) and (max-width: 1024px) {{
-            .main .block-container {{
+        @media (min-width: 769px) and (max-width: 1024px) {
+            .main .block-container {
                 padding: 1rem !important;
-            }}
-            [data-testid="stSidebar"] {{
+            }
+            [data-testid="stSidebar"] {
                 width: 250px !important;
-            }}
-            .js-plotly-plot {{
+            }
+            .js-plotly-plot {
                 height: 350px !important;
-            }}
-            .stTabs [data-baseweb="tab"] {{
+            }
+            .stTabs [data-baseweb="tab"] {
                 max-width: 140px !important;
-            }}
-        }}
+            }
+        }
 
         /* Grandes pantallas */
-        @media (min-width: 1440px) {{
-            .stMetric {{
+        @media (min-width: 1440px) {
+            .stMetric {
                 padding: 20px !important;
-            }}
-        }}
+            }
+        }
+"""
 
-        </style>
-        """
 
-        st.markdown(css, unsafe_allow_html=True)
+def _minify_css(css):
+    """Quita comentarios y espacios sobrantes de una hoja de estilos (una vez, al importar)."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{}:;,])\s*', r'\1', css).strip()
 
-    @staticmethod
-    def get_plotly_template():
-        """Template de Plotly según el tema actual"""
-        if st.session_state.theme == 'dark':
-            return "plotly_dark"
-        else:
-            return "plotly_white"
 
-    @staticmethod
-    def update_visualization_config(config):
-        """Actualiza la configuración de visualización según el tema"""
-        colors = ThemeToggle.get_theme_colors()
+def _write_static_css():
+    """Regenera static/theme.css a partir de _THEME_RULES (paso de build, no se llama al importar)."""
+    os.makedirs(_STATIC_DIR, exist_ok=True)
+    with open(_STATIC_CSS, 'w', encoding='utf-8') as fh:
+        fh.write(_THEME_RULES + '\n')
 
-        # Actualizar colores de la configuración
-        config.LAYOUT_TEMPLATE = ThemeToggle.get_plotly_template()
-        config.COLORS.update(colors)
-        config.FONT_FAMILY = 'Segoe UI, sans-serif'
 
-        return config
+# Una sola hoja para ambos temas, construida una vez al importar; por rerun solo cambia
+# el script que fija data-theme (uno precalculado por tema)
+# Se envía minificada; la fuente legible es _build_theme_rules / _BASE_RULES
+_THEME_RULES = _minify_css(ThemeToggle._build_theme_rules())
+# El id estable permite que el DOM de Streamlit reconozca el bloque como sin cambios
+ThemeToggle._CSS_BLOCK = f'<style id="app-css">{_THEME_RULES}</style>'
+ThemeToggle._CSS_LINK = '<link id="app-css" rel="stylesheet" href="app/static/theme.css">'
+ThemeToggle._THEME_SCRIPT = {
+    theme: f"<script>window.parent.document.documentElement.dataset.theme = '{theme}';</script>"
+    for theme in _THEMES
+}
+# static/theme.css es un artefacto versionado; si falta se usa el bloque <style> en línea
+_STATIC_CSS_READY = os.path.isfile(_STATIC_CSS)
+
+
+if __name__ == '__main__':
+    # python -m components.theme_toggle  → regenera static/theme.css tras editar los estilos
+    _write_static_css()
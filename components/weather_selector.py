@@ -5,9 +5,10 @@ from typing import Dict, Tuple
 
 import streamlit as st
 
-from nucleo import weather_api
 from nucleo.base_conocimientos import PLANTS
 
+# Mapa case-insensitive de PLANTS (la lista se construye una sola vez al importar la KB)
+_PLANTS_LOWER: Dict[str, str] = {p.lower(): p for p in PLANTS}
 
 # Mapeo de departamentos del Perú -> (Región, lat, lon)
 # Coordenadas aproximadas (capital o centro departamental)
@@ -60,6 +61,85 @@ DEPARTMENT_CROPS: Dict[str, Tuple[str, ...]] = {
     'Madre de Dios': ('Plátano', 'Yuca'),
 }
 
+# Índice inverso Región -> departamentos (en el orden de DEPARTMENTS), construido una vez
+_REGION_INDEX: Dict[str, Tuple[str, ...]] = {}
+for _dept, (_region, _lat, _lon) in DEPARTMENTS.items():
+    _REGION_INDEX[_region] = _REGION_INDEX.get(_region, ()) + (_dept,)
+
+# Cultivos de cada departamento ya filtrados contra la base de conocimientos (con el nombre
+# canónico de PLANTS); los que no existen en la KB se descartan aquí y no en cada rerun
+_DEPT_PLANTS: Dict[str, Tuple[str, ...]] = {
+    dept: tuple(_PLANTS_LOWER[x.lower()] for x in crops if x.lower() in _PLANTS_LOWER)
+    for dept, crops in DEPARTMENT_CROPS.items()
+}
+
+# "Aplicar Valores": (key del slider, campo de Open-Meteo, key en weather_inputs, valor por defecto)
+_APPLY_FIELDS: Tuple[Tuple[str, str, str, float], ...] = (
+    ('calc_temp', 'temperature', 'temperature', 25.0),
+    ('calc_soil', 'soil_moisture_est', 'soil_humidity', 40.0),
+    ('calc_rain', 'rain_probability', 'rain_probability', 10.0),
+    ('calc_hum', 'humidity', 'air_humidity', 50.0),
+    ('calc_wind', 'wind_speed', 'wind_speed', 5.0),
+)
+
+# Valores de Open-Meteo mostrados en la tabla: (encabezado, campo del payload)
+_SHOW_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('Temperatura (°C)', 'temperature'),
+    ('Humedad (%)', 'humidity'),
+    ('Probabilidad Lluvia (%)', 'rain_probability'),
+    ('Viento (km/h)', 'wind_speed'),
+    ('Humedad Suelo Est. (%)', 'soil_moisture_est'),
+)
+_SHOW_HEADER = (
+    "| " + " | ".join(h for h, _ in _SHOW_FIELDS) + " |\n"
+    + "|" + "---:|" * len(_SHOW_FIELDS) + "\n"
+)
+
+
+def _fmt(v) -> str:
+    """Formatea un valor numérico con 2 decimales; '-' si falta."""
+    if v is None:
+        return "-"
+    if isinstance(v, (int, float)):
+        return f"{v:.2f}"
+    try:
+        return f"{float(v):.2f}"
+    except (TypeError, ValueError):
+        return str(v)
+
+
+# Vigencia de una consulta a Open-Meteo compartida entre todas las sesiones
+WEATHER_TTL_S = 600
+
+
+class _WeatherFallback(Exception):
+    """Open-Meteo falló; lleva los valores por defecto devueltos por weather_api."""
+
+    def __init__(self, payload: Dict) -> None:
+        super().__init__(payload.get('_error'))
+        self.payload = payload
+
+
+@st.cache_data(ttl=WEATHER_TTL_S, show_spinner=False)
+def _cached_weather(lat: float, lon: float) -> Dict:
+    """Consulta Open-Meteo una vez por (lat, lon) y TTL para todos los usuarios."""
+    # Import diferido: weather_api arrastra `requests` y solo hace falta tras "Consultar clima"
+    from nucleo import weather_api
+
+    payload = weather_api.get_weather(lat, lon, ttl=0)
+    if payload.get('_error'):
+        # st.cache_data no guarda excepciones: así el fallback no queda cacheado
+        raise _WeatherFallback(payload)
+    return payload
+
+
+def _get_weather(lat: float, lon: float) -> Dict:
+    """Datos de Open-Meteo cacheados; si la API falla, los valores por defecto sin cachear."""
+    try:
+        return _cached_weather(lat, lon)
+    except _WeatherFallback as e:
+        return e.payload
+
 
 def render_weather_selector() -> None:
 
@@ -82,7 +162,7 @@ def render_weather_selector() -> None:
 
     # Región como selectbox
     region = st.selectbox("Región", ["Costa", "Sierra", "Selva"], index=0, key="ws_region_main")
-    options = [d for d, v in DEPARTMENTS.items() if v[0] == region]
+    options = _REGION_INDEX.get(region, ())
     if not options:
         st.info("No hay departamentos configurados para esta región")
         return
@@ -91,94 +171,61 @@ def render_weather_selector() -> None:
     reg, lat, lon = DEPARTMENTS.get(dept, (region, -12.0, -77.0))
     st.caption(f"Coordenadas: {lat:.4f}, {lon:.4f}")
 
-    # Obtener automáticamente cuando cambia el departamento / coordenadas
-    need_fetch = (
-        'ws_last_payload' not in st.session_state
-        or st.session_state.get('ws_last_dept') != dept
-        or st.session_state.get('ws_last_latlon') != (lat, lon)
-    )
+    # La primera consulta es explícita; después se sigue al departamento elegido
+    # (st.cache_data evita repetir la petición en reruns de otros widgets)
+    if st.button("Consultar clima", key="ws_fetch"):
+        st.session_state['ws_fetch_enabled'] = True
+    if not st.session_state.get('ws_fetch_enabled'):
+        return
 
-    if need_fetch:
-        try:
-            payload = weather_api.get_weather(lat, lon)
-            st.session_state['ws_last_payload'] = payload
-            st.session_state['ws_last_dept'] = dept
-            st.session_state['ws_last_latlon'] = (lat, lon)
-        except Exception as e:
-            st.error(f"Error consultando Open‑Meteo: {e}")
-
-    payload = st.session_state.get('ws_last_payload')
-    if not payload:
+    try:
+        payload = _get_weather(lat, lon)
+    except Exception as e:
+        st.error(f"Error consultando Open‑Meteo: {e}")
         return
 
     # Guardar y mostrar cultivos/frutas recomendadas para este departamento
-    rec = list(DEPARTMENT_CROPS.get(dept, []))
-    # Filtrar recomendaciones para que exista la planta en la base de conocimientos
-    if rec:
-        # construir mapa case-insensitive de PLANTS
-        available = {p.lower(): p for p in PLANTS}
-        rec_filtered = [available.get(x.lower()) for x in rec if x.lower() in available]
-        rec_filtered = [r for r in rec_filtered if r]
-        if rec_filtered:
-            st.session_state['dept_recommended_plants'] = rec_filtered
-            st.caption(f"Cultivos/verduras/frutas comunes en {dept}: {', '.join(rec_filtered)}")
-        else:
-            # si ninguna recomendación existe en KB, no imponer (limpiamos)
-            st.session_state.pop('dept_recommended_plants', None)
+    rec_filtered = _DEPT_PLANTS.get(dept, ())
+    if rec_filtered:
+        st.session_state['dept_recommended_plants'] = list(rec_filtered)
+        st.caption(f"Cultivos/verduras/frutas comunes en {dept}: {', '.join(rec_filtered)}")
     else:
+        # sin cultivos configurados o ninguno existe en la KB: no imponer (limpiamos)
         st.session_state.pop('dept_recommended_plants', None)
 
     st.markdown("**Valores devueltos por Open‑Meteo:**")
 
-    def _fmt(v):
-        try:
-            if v is None:
-                return "-"
-            return f"{float(v):.2f}"
-        except Exception:
-            return str(v)
-
-    show = {
-        'Temperatura (°C)': _fmt(payload.get('temperature')),
-        'Humedad (%)': _fmt(payload.get('humidity')),
-        'Probabilidad Lluvia (%)': _fmt(payload.get('rain_probability')),
-        'Viento (km/h)': _fmt(payload.get('wind_speed')),
-        'Humedad Suelo Est. (%)': _fmt(payload.get('soil_moisture_est')),
-    }
-    st.table([show])
+    # Una fila de cinco columnas como tabla Markdown (sin construir un DataFrame por rerun)
+    st.markdown(
+        _SHOW_HEADER + "| " + " | ".join(_fmt(payload.get(k)) for _, k in _SHOW_FIELDS) + " |"
+    )
 
     # Botones: Aplicar Valores y Actualizar (no mostrar notificaciones directas aquí)
     c1, c2 = st.columns([2, 1])
     with c1:
         if st.button("Aplicar Valores", key="ws_apply_to_sliders", type="primary"):
-            # aplicar a sliders existentes (keys calc_*)
-            st.session_state['calc_temp'] = float(payload.get('temperature', st.session_state.get('calc_temp', 25.0)))
-            st.session_state['calc_soil'] = float(payload.get('soil_moisture_est', st.session_state.get('calc_soil', 40.0)))
-            st.session_state['calc_rain'] = float(payload.get('rain_probability', st.session_state.get('calc_rain', 10.0)))
-            st.session_state['calc_hum'] = float(payload.get('humidity', st.session_state.get('calc_hum', 50.0)))
-            st.session_state['calc_wind'] = float(payload.get('wind_speed', st.session_state.get('calc_wind', 5.0)))
-            # guardar en weather_inputs
-            st.session_state['weather_inputs'] = {
-                'temperature': st.session_state['calc_temp'],
-                'soil_humidity': st.session_state['calc_soil'],
-                'rain_probability': st.session_state['calc_rain'],
-                'air_humidity': st.session_state['calc_hum'],
-                'wind_speed': st.session_state['calc_wind'],
-                'location': {'department': dept, 'lat': lat, 'lon': lon},
-                'fetched_auto': True,
+            # aplicar a sliders existentes (keys calc_*): se calculan todos y se escriben juntos
+            state = st.session_state
+            sliders = {
+                slider_key: float(payload.get(payload_key, state.get(slider_key, default)))
+                for slider_key, payload_key, _, default in _APPLY_FIELDS
             }
-            st.session_state['ws_applied'] = True
-            st.session_state['ws_applied_ts'] = time.time()
+            # guardar en weather_inputs
+            weather_inputs = {input_key: sliders[slider_key] for slider_key, _, input_key, _ in _APPLY_FIELDS}
+            weather_inputs['location'] = {'department': dept, 'lat': lat, 'lon': lon}
+            weather_inputs['fetched_auto'] = True
+            state.update(
+                sliders,
+                weather_inputs=weather_inputs,
+                ws_applied=True,
+                ws_applied_ts=time.time(),
+            )
 
     with c2:
         if st.button("Actualizar", key="ws_refresh_main", type="secondary"):
+            _cached_weather.clear()
             try:
-                weather_api.invalidate_cache(lat, lon)
-            except Exception:
-                weather_api.invalidate_cache()
-            try:
-                payload = weather_api.get_weather(lat, lon)
-                st.session_state['ws_last_payload'] = payload
+                _get_weather(lat, lon)
                 st.session_state['ws_updated'] = True
                 st.session_state['ws_updated_ts'] = time.time()
             except Exception as e:
@@ -0,0 +1,180 @@
+"""Almacén único del histórico de recomendaciones (data/historico.jsonl).
+
+Mantiene en memoria los últimos registros, protegidos con un lock, y los vuelca al
+disco de forma agrupada. Todo acceso al histórico pasa por get(), append() y flush().
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import threading
+import time
+
+# data/ del proyecto, resuelto desde el paquete y no desde el directorio de trabajo
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# Histórico en JSONL: un registro por línea, así cada volcado solo añade los registros nuevos
+HISTORICO_PATH = os.path.join(_DATA_DIR, "historico.jsonl")
+# Formato anterior (lista JSON completa); solo se lee si aún no existe el JSONL
+HISTORICO_LEGACY_PATH = os.path.join(_DATA_DIR, "historico.json")
+
+HISTORICO_MAX = 100
+# Al superar este número de líneas el JSONL se compacta a los últimos HISTORICO_MAX registros
+HISTORICO_COMPACT_LINES = 1000
+HISTORICO_FLUSH_INTERVAL = 2.0
+
+# orjson (opcional) serializa/parsea varias veces más rápido y trabaja directamente en bytes
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _loads(data: bytes) -> Any:
+    """Parsea JSON desde bytes, con orjson si está disponible."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_linea(obj: Any) -> bytes:
+    """Un registro como línea JSONL compacta (sin indentación) terminada en salto de línea."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _load_historico() -> Tuple[List[Dict[str, Any]], int]:
+    """Devuelve los últimos HISTORICO_MAX registros y el número de líneas del archivo."""
+    try:
+        if os.path.exists(HISTORICO_PATH):
+            lineas = 0
+            # deque con maxlen recorre el archivo conservando solo las últimas líneas
+            ultimas: Deque[bytes] = deque(maxlen=HISTORICO_MAX)
+            with open(HISTORICO_PATH, "rb") as f:
+                for linea in f:
+                    lineas += 1
+                    ultimas.append(linea)
+            return [_loads(linea) for linea in ultimas if linea.strip()], lineas
+        if os.path.exists(HISTORICO_LEGACY_PATH):
+            with open(HISTORICO_LEGACY_PATH, "rb") as f:
+                return _loads(f.read())[-HISTORICO_MAX:], 0
+    except Exception:
+        pass
+    return [], 0
+
+
+# Directorios de histórico ya creados (evita un makedirs por escritura)
+_DIRS_LISTOS: set = set()
+
+
+def _preparar_directorio() -> None:
+    directorio = os.path.dirname(HISTORICO_PATH)
+    if directorio not in _DIRS_LISTOS:
+        os.makedirs(directorio, exist_ok=True)
+        _DIRS_LISTOS.add(directorio)
+
+
+def _write_all(fd: int, payload: bytes) -> None:
+    vista = memoryview(payload)
+    while vista:
+        vista = vista[os.write(fd, vista):]
+
+
+def _append_records(registros: List[Dict[str, Any]]) -> bool:
+    """Añade los registros al final del JSONL con una única escritura en modo append."""
+    try:
+        _preparar_directorio()
+        payload = b"".join(_dumps_linea(r) for r in registros)
+        fd = os.open(HISTORICO_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            _write_all(fd, payload)
+        finally:
+            os.close(fd)
+        return True
+    except Exception:
+        return False
+
+
+def _save_historico(registros: List[Dict[str, Any]]) -> bool:
+    """Reescribe el JSONL completo (compactación) con los últimos HISTORICO_MAX registros."""
+    try:
+        _preparar_directorio()
+        payload = b"".join(_dumps_linea(r) for r in registros[-HISTORICO_MAX:])
+        # Escritura atómica: archivo temporal + os.replace, así un lector nunca ve un archivo a medias
+        tmp_path = HISTORICO_PATH + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            _write_all(fd, payload)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, HISTORICO_PATH)
+        return True
+    except Exception:
+        return False
+
+
+# Write-behind: el histórico se mantiene en memoria (cargado del disco una sola vez) y los
+# registros nuevos se añaden al archivo como mucho cada HISTORICO_FLUSH_INTERVAL segundos,
+# y al terminar el proceso.
+_HISTORICO_CACHE: Optional[Deque[Dict[str, Any]]] = None
+_historico_pendientes: List[Dict[str, Any]] = []
+_historico_lineas = 0
+_historico_lock = threading.Lock()
+_last_historico_flush = 0.0
+
+
+def _flush_pendientes() -> None:
+    """Vuelca los registros pendientes (llamar con _historico_lock tomado)."""
+    global _historico_pendientes, _historico_lineas, _last_historico_flush
+    _last_historico_flush = time.time()
+    lineas = _historico_lineas + len(_historico_pendientes)
+    # Se reescribe al superar el umbral, o si el archivo no contiene todo lo que hay en
+    # memoria (p. ej. registros migrados desde el historico.json anterior)
+    if lineas > HISTORICO_COMPACT_LINES or len(_HISTORICO_CACHE) > lineas:
+        ok = _save_historico(list(_HISTORICO_CACHE))
+        nuevas = min(len(_HISTORICO_CACHE), HISTORICO_MAX)
+    else:
+        ok = _append_records(_historico_pendientes)
+        nuevas = lineas
+    if ok:
+        _historico_lineas = nuevas
+        _historico_pendientes = []
+
+
+def _cargar() -> Deque[Dict[str, Any]]:
+    """Carga el histórico del disco una sola vez (llamar con _historico_lock tomado)."""
+    global _HISTORICO_CACHE, _historico_lineas
+    if _HISTORICO_CACHE is None:
+        registros, _historico_lineas = _load_historico()
+        _HISTORICO_CACHE = deque(registros, maxlen=HISTORICO_MAX)
+    return _HISTORICO_CACHE
+
+
+def get() -> List[Dict[str, Any]]:
+    """Copia de los últimos HISTORICO_MAX registros, incluidos los aún no volcados."""
+    with _historico_lock:
+        return list(_cargar())
+
+
+def append(registro: Dict[str, Any]) -> None:
+    """Añade un registro al histórico en memoria; lo vuelca si pasó el intervalo."""
+    with _historico_lock:
+        _cargar().append(registro)
+        _historico_pendientes.append(registro)
+        if time.time() - _last_historico_flush < HISTORICO_FLUSH_INTERVAL:
+            return
+        _flush_pendientes()
+
+
+def flush() -> None:
+    """Escribe ya los registros pendientes en historico.jsonl (si los hay)."""
+    with _historico_lock:
+        if not _historico_pendientes or _HISTORICO_CACHE is None:
+            return
+        _flush_pendientes()
+
+
+atexit.register(flush)
@@ -1,139 +1,284 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, Sequence, Tuple
+import functools
 import json
 import os
 
+from . import _historico_store
+
+# orjson (opcional) parsea varias veces más rápido y trabaja directamente en bytes
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _loads(data: bytes) -> Any:
+    """Parsea JSON desde bytes, con orjson si está disponible."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# plantas.json del proyecto, resuelto desde el paquete y no desde el directorio de trabajo
+PLANTAS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "plantas.json")
+
+# Mensajes y reglas de recomendar_riego por estado: (bajo, dentro de rango, alto)
+_HUM_MSG = (
+    "- Humedad baja: aumentar riego.\n",
+    "- Humedad dentro del rango óptimo.\n",
+    "- Humedad alta: reducir riego.\n",
+)
+_HUM_RULE = (
+    "humedad_actual < humedad_optima → aumentar riego",
+    "humedad_actual dentro de rango → mantener riego",
+    "humedad_actual > humedad_optima → reducir riego",
+)
+_TEMP_MSG = (
+    "- Temperatura baja: riego moderado.\n",
+    "- Temperatura ideal para el cultivo.\n",
+    "- Temperatura alta: aumentar riego.\n",
+)
+_TEMP_RULE = (
+    "temperatura_actual < temperatura_optima → riego moderado",
+    "temperatura_actual dentro de rango → riego normal",
+    "temperatura_actual > temperatura_optima → aumentar riego",
+)
+# Las 9 combinaciones (humedad, temperatura) ya armadas: índice h * 3 + t con
+# (mensaje de estado, bloque de reglas activadas)
+_COMBINED = tuple(
+    (
+        _HUM_MSG[h] + _TEMP_MSG[t],
+        f"\n📜 Reglas activadas:\n- {_HUM_RULE[h]}\n- {_TEMP_RULE[t]}\n",
+    )
+    for h in range(3)
+    for t in range(3)
+)
+
 
 class KnowledgeBase:
     """
     Clase encargada de manejar la base de conocimiento de plantas y reglas de riego.
     """
 
-    def __init__(self, data_path="data/plantas.json"):
+    def __init__(self, data_path=PLANTAS_PATH):
         self.data_path = os.path.abspath(data_path)
         self.plantas = self.cargar_datos()
+        # Índice sin distinción de mayúsculas: nombre en minúsculas -> (nombre original, datos)
+        self._by_lower = {nombre.lower(): (nombre, datos) for nombre, datos in self.plantas.items()}
 
     def cargar_datos(self):
         """Carga la información de las plantas desde el archivo JSON."""
         try:
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Convertimos la lista a diccionario con nombre original
-                return {planta["nombre"]: planta for planta in data}
+            # Una sola lectura del archivo completo y parseo sobre los bytes
+            with open(self.data_path, "rb") as f:
+                data = _loads(f.read())
+            for planta in data:
+                # Rangos como tuplas de float y factor como float, ya listos para el cálculo
+                for clave in ("humedad_suelo_opt", "temperatura_opt"):
+                    if clave in planta:
+                        planta[clave] = tuple(map(float, planta[clave]))
+                planta["factor_ajuste"] = float(planta.get("factor_ajuste", 1.0))
+            # Convertimos la lista a diccionario con nombre original
+            return {planta["nombre"]: planta for planta in data}
         except FileNotFoundError:
             print("⚠️ Archivo de plantas no encontrado, usando base vacía.")
             return {}
 
     def obtener_info_planta(self, nombre_planta):
         """Devuelve los parámetros de una planta específica."""
-        return self.plantas.get(nombre_planta.title(), None)
+        entrada = self._by_lower.get(nombre_planta.lower())
+        return entrada[1] if entrada else None
 
     def recomendar_riego(self, nombre_planta, humedad_actual, temperatura_actual):
         """
         Devuelve una recomendación textual según las condiciones actuales comparadas
         con los valores óptimos y explica qué reglas se activaron.
         """
-        planta = self.obtener_info_planta(nombre_planta)
-        if not planta:
+        entrada = self._by_lower.get(nombre_planta.lower())
+        if not entrada:
             return "❌ No se encontró información de esta planta."
-
-        mensaje = f"🌿 Recomendación para {nombre_planta.capitalize()}:\n"
-        reglas_activadas = []
+        nombre, planta = entrada
 
         hum_min, hum_max = planta["humedad_suelo_opt"]
         temp_min, temp_max = planta["temperatura_opt"]
 
-        # Evaluación de humedad
-        if humedad_actual < hum_min:
-            mensaje += "- Humedad baja: aumentar riego.\n"
-            reglas_activadas.append("humedad_actual < humedad_optima → aumentar riego")
-        elif humedad_actual > hum_max:
-            mensaje += "- Humedad alta: reducir riego.\n"
-            reglas_activadas.append("humedad_actual > humedad_optima → reducir riego")
-        else:
-            mensaje += "- Humedad dentro del rango óptimo.\n"
-            reglas_activadas.append("humedad_actual dentro de rango → mantener riego")
+        # Evaluación de humedad y temperatura: índice 0 = bajo, 1 = en rango, 2 = alto
+        h_idx = (humedad_actual > hum_max) - (humedad_actual < hum_min) + 1
+        t_idx = (temperatura_actual > temp_max) - (temperatura_actual < temp_min) + 1
+
+        mensaje, reglas = _COMBINED[h_idx * 3 + t_idx]
+
+        # El mensaje se arma por partes y se une una sola vez al final
+        partes = [
+            f"🌿 Recomendación para {nombre}:\n",
+            mensaje,
+            # Consejos adicionales de la planta
+            f"💡 Consejos: {planta['consejos']}\n",
+            # Mostrar reglas activadas
+            reglas,
+        ]
+        return "".join(partes)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_kb() -> KnowledgeBase:
+    """KB compartida; plantas.json se lee en el primer uso y no al importar el módulo."""
+    return KnowledgeBase()
+
+
+# Atributos del módulo que se construyen bajo demanda (PEP 562): kb, PLANT_KB y PLANTS
+_LAZY_ATTRS = {
+    "kb": lambda: _get_kb(),
+    "PLANT_KB": lambda: _get_kb().plantas,
+    "PLANTS": lambda: list(_get_kb().plantas.keys()),
+}
+
+
+def __getattr__(name: str) -> Any:
+    factory = _LAZY_ATTRS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = factory()
+    # Se fija como global: los accesos siguientes ya no pasan por __getattr__
+    globals()[name] = value
+    return value
+
+
+# El histórico vive en un único almacén compartido del paquete
+_append_historico = _historico_store.append
+flush_historico = _historico_store.flush
 
-        # Evaluación de temperatura
-        if temperatura_actual < temp_min:
-            mensaje += "- Temperatura baja: riego moderado.\n"
-            reglas_activadas.append("temperatura_actual < temperatura_optima → riego moderado")
-        elif temperatura_actual > temp_max:
-            mensaje += "- Temperatura alta: aumentar riego.\n"
-            reglas_activadas.append("temperatura_actual > temperatura_optima → aumentar riego")
-        else:
-            mensaje += "- Temperatura ideal para el cultivo.\n"
-            reglas_activadas.append("temperatura_actual dentro de rango → riego normal")
 
-        # Consejos adicionales de la planta
-        mensaje += f"💡 Consejos: {planta['consejos']}\n"
+def _make_ajuste(factor: float, hum_min: float, hum_max: float, consejos: str):
+    """Parte pura de get_recomendacion especializada para una planta.
+
+    Factor, rango óptimo de humedad y consejos quedan fijados en el closure, así que el
+    ajuste por llamada es solo aritmética sobre (humedad_suelo, tiempo_min).
+    """
+    def ajuste(humedad_suelo: float, tiempo_min: float) -> Tuple[float, str]:
+        tiempo_aj = tiempo_min * factor
+        # Heurística simple: si humedad_suelo está por encima del óptimo, reducir 20%
+        if humedad_suelo > hum_max:
+            tiempo_aj *= 0.8
+        elif humedad_suelo < hum_min:
+            tiempo_aj *= 1.1
+        return max(0.0, min(60.0, tiempo_aj)), consejos
+
+    return ajuste
+
+
+# Parámetros numéricos del ajuste por planta: (factor, humedad mínima, humedad máxima)
+_PARAMS_DEFAULT = (1.0, 0.0, 100.0)  # Plantas fuera de la KB: sin factor ni rango óptimo
+_AJUSTE_DEFAULT = _make_ajuste(*_PARAMS_DEFAULT, "")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_ajustes() -> Tuple[Dict[str, Tuple[float, float, float]], Dict[str, Any]]:
+    """Parámetros y funciones de ajuste por planta, construidos al primer uso de la KB."""
+    plantas = _get_kb().plantas
+    params_por_planta = {
+        nombre: (datos["factor_ajuste"], *datos.get("humedad_suelo_opt", (0.0, 100.0)))
+        for nombre, datos in plantas.items()
+    }
+    ajuste_por_planta = {
+        nombre: _make_ajuste(*params, plantas[nombre].get("consejos", ""))
+        for nombre, params in params_por_planta.items()
+    }
+    return params_por_planta, ajuste_por_planta
 
-        # Mostrar reglas activadas
-        mensaje += "\n📜 Reglas activadas:\n"
-        for regla in reglas_activadas:
-            mensaje += f"- {regla}\n"
 
-        return mensaje
+@dataclass(frozen=True)
+class _PlantasSoA:
+    """Vista Struct-of-Arrays de la KB: un array por parámetro, una posición por planta.
 
+    La última posición corresponde a una planta fuera de la KB (parámetros por defecto).
+    """
+    idx: Dict[str, int]
+    hum_lo: Any
+    hum_hi: Any
+    temp_lo: Any
+    temp_hi: Any
+    factor: Any
+
+
+@functools.lru_cache(maxsize=1)
+def _get_soa() -> _PlantasSoA:
+    # NumPy solo hace falta en el camino por lotes: no encarece importar la KB
+    import numpy as np
+
+    plantas = _get_kb().plantas
+    sin_rango = (float("-inf"), float("inf"))
+
+    def columna(valores, defecto):
+        return np.array([*valores, defecto], dtype=np.float64)
 
-kb = KnowledgeBase("data/plantas.json")
-PLANT_KB: Dict[str, Dict[str, Any]] = kb.plantas
-PLANTS = list(PLANT_KB.keys())
+    hum = [d.get("humedad_suelo_opt", _PARAMS_DEFAULT[1:]) for d in plantas.values()]
+    temp = [d.get("temperatura_opt", sin_rango) for d in plantas.values()]
+    return _PlantasSoA(
+        idx={nombre: i for i, nombre in enumerate(plantas)},
+        hum_lo=columna((h[0] for h in hum), _PARAMS_DEFAULT[1]),
+        hum_hi=columna((h[1] for h in hum), _PARAMS_DEFAULT[2]),
+        temp_lo=columna((t[0] for t in temp), sin_rango[0]),
+        temp_hi=columna((t[1] for t in temp), sin_rango[1]),
+        factor=columna((d["factor_ajuste"] for d in plantas.values()), _PARAMS_DEFAULT[0]),
+    )
 
 
-HISTORICO_PATH = os.path.join("data", "historico.json")
+def indices_plantas(plantas: Sequence[str]):
+    """Índices de las plantas en la vista SoA; las desconocidas usan la fila por defecto."""
+    import numpy as np
 
+    soa = _get_soa()
+    desconocida = len(soa.idx)
+    return np.fromiter((soa.idx.get(p, desconocida) for p in plantas), dtype=np.intp, count=len(plantas))
+
+
+def batch_get_recomendacion(idx, hs, tiempo):
+    """Tiempo ajustado vectorizado a partir de índices de planta (ver indices_plantas).
+
+    Aplica la misma heurística que get_recomendacion sobre arrays de humedad de suelo y
+    tiempo base, sin tocar el histórico. Devuelve un array float64 en [0, 60].
+    """
+    import numpy as np
 
-def _load_historico() -> List[Dict[str, Any]]:
-    try:
-        if os.path.exists(HISTORICO_PATH):
-            with open(HISTORICO_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return []
+    soa = _get_soa()
+    hs = np.asarray(hs, dtype=np.float64)
+    t = np.asarray(tiempo, dtype=np.float64) * soa.factor[idx]
+    t = np.where(hs > soa.hum_hi[idx], t * 0.8, np.where(hs < soa.hum_lo[idx], t * 1.1, t))
+    return np.clip(t, 0.0, 60.0)
 
 
-def _save_historico(registros: List[Dict[str, Any]]) -> None:
-    try:
-        os.makedirs(os.path.dirname(HISTORICO_PATH), exist_ok=True)
-        with open(HISTORICO_PATH, "w", encoding="utf-8") as f:
-            json.dump(registros[-100:], f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+def tiempo_ajustado_batch(plantas: Sequence[str], humedades_suelo, tiempos_min):
+    """Tiempo ajustado de get_recomendacion para un lote de escenarios (sin tocar el histórico)."""
+    return batch_get_recomendacion(indices_plantas(plantas), humedades_suelo, tiempos_min)
 
 
 def get_recomendacion(planta: str, condiciones: Dict[str, float], decision: Dict[str, float]) -> Dict[str, Any]:
-    """Ajusta la recomendación según KB y guarda en historico.json (últimos 100).
+    """Ajusta la recomendación según KB y guarda en historico.jsonl (últimos 100).
 
     condiciones: {temperatura, humedad_suelo, prob_lluvia, humedad_ambiente, velocidad_viento}
     decision: {tiempo_min, frecuencia}
     """
-    kb = PLANT_KB.get(planta, {})
-    factor = float(kb.get("factor_ajuste", 1.0))
-    tiempo_aj = float(decision.get("tiempo_min", 0)) * factor
-    # Heurística simple: si humedad_suelo está por encima del óptimo, reducir 20%
-    hs = float(condiciones.get("humedad_suelo", 0))
-    opt = kb.get("humedad_suelo_opt", [0, 100])
-    if hs > opt[1]:
-        tiempo_aj *= 0.8
-    if hs < opt[0]:
-        tiempo_aj *= 1.1
+    tiempo_aj, consejos = _get_ajustes()[1].get(planta, _AJUSTE_DEFAULT)(
+        float(condiciones.get("humedad_suelo", 0)),
+        float(decision.get("tiempo_min", 0)),
+    )
 
     out = {
         "planta": planta,
-        "tiempo_ajustado": max(0.0, min(60.0, tiempo_aj)),
+        "tiempo_ajustado": tiempo_aj,
         "frecuencia": float(decision.get("frecuencia", 0)),
-        "consejos": kb.get("consejos", ""),
+        "consejos": consejos,
     }
 
-    # Guardar en historico.json (mantener 100)
-    registros = _load_historico()
-    registros.append({
+    # Guardar en historico.jsonl (mantener 100); la escritura se agrupa en flush_historico
+    _append_historico({
         **condiciones,
         "planta": planta,
         "tiempo_min": round(out["tiempo_ajustado"], 2),
         "frecuencia": round(out["frecuencia"], 2),
     })
-    _save_historico(registros)
     return out
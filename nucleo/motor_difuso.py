@@ -1,4 +1,7 @@
 from __future__ import annotations
+import functools
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Dict, Tuple, Any, List
 import numpy as np
@@ -14,6 +17,21 @@ WIND_UNIVERSE = np.linspace(0, 50, 501)
 TIME_UNIVERSE = np.linspace(0, 60, 601)
 FREQ_UNIVERSE = np.linspace(0, 4, 401)
 
+# Entradas máximas del cache de inferencias del motor
+CACHE_MAXSIZE = 1024
+
+# Identificadores de las 33 reglas, en el orden de _create_rules()
+RULE_NAMES: Tuple[str, ...] = tuple(f"R{i}" for i in range(1, 34))
+
+
+def activations_to_array(activaciones: Dict[str, float]) -> np.ndarray:
+    """Activaciones como array float64 posicional (orden de RULE_NAMES); 0.0 si falta la regla."""
+    return np.fromiter(
+        (activaciones.get(nombre, 0.0) for nombre in RULE_NAMES),
+        dtype=np.float64,
+        count=len(RULE_NAMES),
+    )
+
 
 @dataclass
 class FuzzyResult:
@@ -29,7 +47,10 @@ class FuzzyIrrigationSystem:
 
     def __init__(self) -> None:
         self._build_system()
-        self._cache = {}  # Cache simple para mejor performance
+        self._cache: "OrderedDict[tuple, Tuple[float, float, Dict[str, float]]]" = OrderedDict()  # LRU acotado
+        self._lock = threading.Lock()
+        # Lock propio del cache: consultas y desalojos no esperan a una inferencia en curso
+        self._cache_lock = threading.Lock()
 
     def _build_system(self) -> None:
         # Definir variables
@@ -183,32 +204,39 @@ class FuzzyIrrigationSystem:
             round(wind_speed, 1), round(ajuste_planta, 2)
         )
 
-        # Verificar cache
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        # Verificar cache (un acierto pasa a ser la entrada más reciente)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
 
         # Validación básica - versión simplificada sin warnings constantes
-        try:
-            self._sim.input["temperatura"] = float(temperature)
-            self._sim.input["humedad_suelo"] = float(soil_humidity)
-            self._sim.input["lluvia"] = float(rain_probability)
-            self._sim.input["humedad_aire"] = float(air_humidity)
-            self._sim.input["viento"] = float(wind_speed)
-            self._sim.compute()
-
-            # Verificar que las salidas existen
-            if "tiempo" not in self._sim.output or "frecuencia" not in self._sim.output:
-                # Fallback silencioso a valores por defecto cuando el sistema complejo falla
+        # La simulación de skfuzzy guarda estado (entradas/salidas): una sola instancia
+        # se comparte entre sesiones, así que escribir entradas y leer salidas va bajo lock
+        with self._lock:
+            try:
+                self._sim.input["temperatura"] = float(temperature)
+                self._sim.input["humedad_suelo"] = float(soil_humidity)
+                self._sim.input["lluvia"] = float(rain_probability)
+                self._sim.input["humedad_aire"] = float(air_humidity)
+                self._sim.input["viento"] = float(wind_speed)
+                self._sim.compute()
+
+                # Verificar que las salidas existen
+                if "tiempo" not in self._sim.output or "frecuencia" not in self._sim.output:
+                    # Fallback silencioso a valores por defecto cuando el sistema complejo falla
+                    return 15.0, 2.0, {}
+
+            except Exception as e:
+                # Sistema complejo falló, retornar valores seguros sin mostrar warnings constantes
                 return 15.0, 2.0, {}
 
-        except Exception as e:
-            # Sistema complejo falló, retornar valores seguros sin mostrar warnings constantes
-            return 15.0, 2.0, {}
+            tiempo_raw = self._sim.output.get("tiempo", 15.0)
+            frecuencia_raw = self._sim.output.get("frecuencia", 2.0)
 
         # Aplicar ajuste de planta con límites
         ajuste = max(0.3, min(1.5, float(ajuste_planta)))
-        tiempo_raw = self._sim.output.get("tiempo", 15.0)
-        frecuencia_raw = self._sim.output.get("frecuencia", 2.0)
 
         tiempo = float(tiempo_raw) * ajuste
         frecuencia = float(frecuencia_raw) * (0.85 + 0.3 * ajuste)
@@ -223,13 +251,57 @@ class FuzzyIrrigationSystem:
 
         resultado = (tiempo, frecuencia, activ)
 
-        # Guardar en cache (máximo 100 entradas)
-        if len(self._cache) >= 100:
-            self._cache.pop(next(iter(self._cache)))
-        self._cache[cache_key] = resultado
+        # Guardar en cache, descartando la entrada usada hace más tiempo
+        with self._cache_lock:
+            self._cache[cache_key] = resultado
+            if len(self._cache) > CACHE_MAXSIZE:
+                self._cache.popitem(last=False)
 
         return resultado
 
+    def clear_cache(self) -> None:
+        """Vacía el cache de inferencias (p. ej. tras modificar reglas o funciones de membresía)."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def calculate_irrigation_batch(
+        self,
+        temperatures: np.ndarray,
+        soil_humidities: np.ndarray,
+        rain_probabilities: np.ndarray,
+        air_humidities: np.ndarray,
+        wind_speeds: np.ndarray,
+        ajustes_planta: np.ndarray | float = 1.0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calcula tiempo y frecuencia para un lote de escenarios (una fila por escenario).
+
+        Las entradas se cuantizan igual que la clave de cache de calculate_irrigation y
+        solo se infieren las filas distintas; el resultado se reparte al lote completo.
+
+        Returns:
+            tuple: (tiempos_min, frecuencias) como arrays de la forma del lote
+        """
+        entradas = np.broadcast_arrays(
+            np.asarray(temperatures, dtype=float),
+            np.asarray(soil_humidities, dtype=float),
+            np.asarray(rain_probabilities, dtype=float),
+            np.asarray(air_humidities, dtype=float),
+            np.asarray(wind_speeds, dtype=float),
+            np.asarray(ajustes_planta, dtype=float),
+        )
+        lote = np.column_stack([e.ravel() for e in entradas])
+        lote[:, :5] = np.round(lote[:, :5], 1)
+        lote[:, 5] = np.round(lote[:, 5], 2)
+
+        unicos, inverso = np.unique(lote, axis=0, return_inverse=True)
+        salidas = np.empty((len(unicos), 2))
+        for i, (t, hs, pl, ha, v, aj) in enumerate(unicos.tolist()):
+            salidas[i, 0], salidas[i, 1], _ = self.calculate_irrigation(t, hs, pl, ha, v, aj)
+
+        forma = entradas[0].shape
+        inverso = inverso.ravel()
+        return salidas[inverso, 0].reshape(forma), salidas[inverso, 1].reshape(forma)
+
     def calcular_riego(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Calcula riego a partir de un diccionario de entradas en español.
 
@@ -299,7 +371,8 @@ class FuzzyIrrigationSystem:
         }
 
         activ: Dict[str, float] = {}
-        mn = lambda *xs: float(np.min(xs))
+        # AND de Mamdani (mínimo); min() nativo evita crear un array por regla
+        mn = lambda *xs: float(min(xs))
 
         # Mapeo 1:1 con las reglas creadas en _create_rules()
         activ["R1"] = deg["l_alta"]
@@ -608,3 +681,9 @@ class FuzzyIrrigationSystem:
 
 # Compatibilidad: alias para mantener imports existentes funcionando
 SistemaRiegoDifuso = FuzzyIrrigationSystem
+
+
+@functools.lru_cache(maxsize=1)
+def get_engine() -> FuzzyIrrigationSystem:
+    """Motor difuso compartido por todo el proceso (se construye una sola vez)."""
+    return FuzzyIrrigationSystem()
@@ -1,10 +1,14 @@
 from __future__ import annotations
+import atexit
+import functools
 import json
 import logging
 import os
+import threading
 import time
 from dataclasses import dataclass
 from typing import Any, Dict, List, Tuple
+import numpy as np
 import pandas as pd
 
 # Ensure logs directory exists before logging setup
@@ -39,6 +43,7 @@ def ensure_data_files() -> None:
                 "planta",
                 "tiempo_min",
                 "frecuencia",
+                "confianza",
             ]
         ).to_csv(HISTORY_CSV, index=False)
     if not os.path.exists(HISTORY_JSONL):
@@ -72,18 +77,62 @@ def validate_inputs(
 
 def save_history(record: Dict[str, Any]) -> None:
     """Append a decision record to history files."""
+    save_history_batch([record])
+
+
+def save_history_batch(records: List[Dict[str, Any]]) -> None:
+    """Append several decision records to the history files in one write each."""
+    if not records:
+        return
     ensure_data_files()
-    logger.info(f"Saving history record for plant {record.get('planta')}: time={record.get('tiempo_min')}, frequency={record.get('frecuencia')}")
+    for record in records:
+        logger.info("Saving history record for plant %s: time=%s, frequency=%s",
+                    record.get('planta'), record.get('tiempo_min'), record.get('frecuencia'))
 
     # CSV
-    df = pd.DataFrame([record])
+    df = pd.DataFrame(records)
     if os.path.exists(HISTORY_CSV):
         df.to_csv(HISTORY_CSV, mode="a", header=False, index=False)
     else:
         df.to_csv(HISTORY_CSV, index=False)
     # JSONL
     with open(HISTORY_JSONL, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+
+# Write-behind buffer: records queued within HISTORY_FLUSH_INTERVAL seconds of the
+# last write are held in memory and appended together on the next flush.
+HISTORY_FLUSH_INTERVAL = 2.0
+_history_buffer: List[Dict[str, Any]] = []
+_history_lock = threading.Lock()
+_last_history_flush = 0.0
+
+
+def queue_history(record: Dict[str, Any]) -> None:
+    """Queue a record; write it (with any pending ones) once the flush interval elapsed."""
+    global _last_history_flush
+    with _history_lock:
+        _history_buffer.append(record)
+        now = time.time()
+        if now - _last_history_flush < HISTORY_FLUSH_INTERVAL:
+            return
+        pending = _history_buffer[:]
+        _history_buffer.clear()
+        _last_history_flush = now
+        save_history_batch(pending)
+
+
+def flush_history() -> None:
+    """Write any queued history records now (call before reading the history)."""
+    global _last_history_flush
+    with _history_lock:
+        pending = _history_buffer[:]
+        _history_buffer.clear()
+        _last_history_flush = time.time()
+        save_history_batch(pending)
+
+
+atexit.register(flush_history)
 
 
 def load_history() -> pd.DataFrame:
@@ -128,6 +177,7 @@ def clear_history() -> None:
         f.write("")
 
 
+@functools.lru_cache(maxsize=512)
 def estimate_water_saving(tiempo_min: float, frecuencia: float) -> float:
     """Heurística simple para estimar ahorro de agua (L/semana).
 
@@ -139,3 +189,35 @@ def estimate_water_saving(tiempo_min: float, frecuencia: float) -> float:
     # Escalar a litros/semana (ej. 100 L como base de referencia diaria)
     litros_dia_base = 100.0
     return round(ahorro_rel * litros_dia_base * 7.0, 1)
+
+
+def lttb_indices(x: Any, y: Any, threshold: int) -> np.ndarray:
+    """Índices de submuestreo Largest-Triangle-Three-Buckets para una serie ordenada por x.
+
+    Conserva el primer y el último punto y, en cada bucket intermedio, el punto que
+    forma el triángulo de mayor área con el punto elegido anterior y el promedio del
+    bucket siguiente. Si la serie tiene `threshold` puntos o menos, devuelve todos.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    idx = np.empty(threshold, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
@@ -16,7 +16,7 @@ except ImportError as e:
     raise ImportError(f"Missing required packages: {e}")
 
 from .configuracion import VisualizationConfig
-from ..motor_difuso import SistemaRiegoDifuso
+from ..motor_difuso import SistemaRiegoDifuso, get_engine as _get_engine
 from .pertenencia import VisualizadorPertenencia
 from .superficies import VisualizadorSuperficies
 from .reglas import VisualizadorReglas
@@ -46,7 +46,7 @@ class FuzzyVisualizer:
         Args:
             system: Instancia del sistema de riego difuso
         """
-        self.system = system or SistemaRiegoDifuso()
+        self.system = system or _get_engine()
         self.config = VisualizationConfig()
         self._update_theme_colors()  # Actualizar colores según tema actual
 
@@ -303,48 +303,41 @@ def renderizar_pagina_visualizaciones() -> None:
 
     # Inicializar sistema
     try:
-        from ..motor_difuso import SistemaRiegoDifuso
-        system = SistemaRiegoDifuso()
-        visualizer = FuzzyVisualizer(system)
+        visualizer = FuzzyVisualizer(_get_engine())
     except Exception as e:
         st.error(f"❌ Error inicializando sistema de riego: {e}")
         return
 
-    # Menú de navegación con tabs
-    tab_dashboard, tab_membership, tab_surfaces, tab_rules, tab_plants, tab_sensitivity = st.tabs([
-        "🏠 Dashboard",
-        "🎛️ Membresía",
-        "🌐 3D",
-        "🔍 Reglas",
-        "🌱 Plantas",
-        "📈 Sensibilidad"
-    ])
+    # Menú de navegación: solo se renderiza la sección activa
+    # (st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun)
+    seccion = st.radio(
+        "Sección",
+        ["🏠 Dashboard", "🎛️ Membresía", "🌐 3D", "🔍 Reglas", "🌱 Plantas", "📈 Sensibilidad"],
+        horizontal=True,
+        key="viz_section",
+        label_visibility="collapsed",
+    )
 
     # Calcular outputs
     try:
-        tiempo, freq, _ = system.calculate_irrigation(**current_inputs)
+        tiempo, freq, _ = visualizer.system.calculate_irrigation(**current_inputs)
         outputs = {'tiempo': tiempo, 'frecuencia': freq}
     except Exception as e:
         st.error(f"Error calculando irrigación: {e}")
         outputs = {'tiempo': 0, 'frecuencia': 0}
 
-    # Renderizar según tab seleccionado
-    with tab_dashboard:
+    # Renderizar según sección seleccionada
+    if seccion == "🏠 Dashboard":
         visualizer.render_main_dashboard(current_inputs, outputs)
-
-    with tab_membership:
+    elif seccion == "🎛️ Membresía":
         visualizer.plot_membership_functions_enhanced()
-
-    with tab_surfaces:
+    elif seccion == "🌐 3D":
         visualizer.plot_control_surfaces()
-
-    with tab_rules:
+    elif seccion == "🔍 Reglas":
         visualizer.plot_rule_analysis(current_inputs)
-
-    with tab_plants:
+    elif seccion == "🌱 Plantas":
         visualizer.plot_plant_comparison()
-
-    with tab_sensitivity:
+    elif seccion == "📈 Sensibilidad":
         visualizer.plot_sensitivity_analysis(current_inputs)
 
 
@@ -394,8 +387,7 @@ def radar_inputs(vals: Dict[str, float]) -> None:
 
 def plot_surface_3d(var1: str, var2: str, output: str) -> None:
     """Función legacy - mantiene compatibilidad"""
-    system = SistemaRiegoDifuso()
-    visualizer = FuzzyVisualizer(system)
+    visualizer = FuzzyVisualizer(_get_engine())
 
     # Mapear nombres antiguos a nuevos
     var_map = {
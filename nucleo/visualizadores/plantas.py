@@ -101,7 +101,7 @@ class VisualizadorPlantas:
                     y=[hum_opt[0], np.mean(hum_opt), hum_opt[1] if len(hum_opt) > 1 else np.mean(hum_opt)],
                     marker_color=color,
                     showlegend=(idx == 0),
-                    text=[f"{hum_opt[0]}", f"{np.mean(hum_opt):.0f}", f"{hum_opt[1] if len(hum_opt) > 1 else np.mean(hum_opt):.0f}"],
+                    text=[f"{hum_opt[0]:g}", f"{np.mean(hum_opt):.0f}", f"{hum_opt[1] if len(hum_opt) > 1 else np.mean(hum_opt):.0f}"],
                     textposition='outside'
                 ),
                 row=1, col=1
@@ -231,7 +231,7 @@ class VisualizadorPlantas:
             hum_opt = data.get('humedad_suelo_opt', [0, 0])
             table_data.append({
                 'Planta': plant,
-                'Humedad Suelo (%)': f"{hum_opt[0]}-{hum_opt[1]}" if len(hum_opt) > 1 else f"{hum_opt[0]}",
+                'Humedad Suelo (%)': f"{hum_opt[0]:g}-{hum_opt[1]:g}" if len(hum_opt) > 1 else f"{hum_opt[0]:g}",
                 'Temperatura (°C)': f"{data.get('temp_range', [0, 0])[0]}-{data.get('temp_range', [0, 0])[1]}",
                 'Tolerancia Sequía': f"{data.get('tolerancia_sequia', 0)}/10",
                 'Frecuencia': f"{data.get('frecuencia_riego', 0)}x/día",
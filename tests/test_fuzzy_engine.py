@@ -1,5 +1,5 @@
 import pytest
-from nucleo.motor_difuso import FuzzyIrrigationSystem
+from nucleo.motor_difuso import FuzzyIrrigationSystem, RULE_NAMES, activations_to_array
 
 
 def test_calcular_riego_seco():
@@ -40,3 +40,51 @@ def test_rango_salidas():
         )
         assert 0 <= t <= 60
         assert 0 <= f <= 4
+
+
+def test_calculo_por_lotes_coincide_con_escalar():
+    sys = FuzzyIrrigationSystem()
+    escenarios = [(35, 10, 5, 30, 10, 1.0), (20, 85, 40, 70, 8, 0.8), (35, 10, 5, 30, 10, 1.0)]
+    tiempos, frecuencias = sys.calculate_irrigation_batch(*zip(*escenarios))
+    assert tiempos.shape == frecuencias.shape == (3,)
+    for i, escenario in enumerate(escenarios):
+        t, f, _ = sys.calculate_irrigation(*escenario)
+        assert tiempos[i] == t
+        assert frecuencias[i] == f
+
+
+def test_motor_compartido_entre_hilos():
+    from concurrent.futures import ThreadPoolExecutor
+
+    escenarios = [(t, h, 20, 50, 10) for t in (10, 25, 40) for h in (15, 50, 85)]
+    esperado = [FuzzyIrrigationSystem().calculate_irrigation(*e)[:2] for e in escenarios]
+
+    sys = FuzzyIrrigationSystem()
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        obtenido = list(ex.map(lambda e: sys.calculate_irrigation(*e)[:2], escenarios))
+    assert obtenido == esperado
+
+
+def test_activaciones_como_array_posicional():
+    sys = FuzzyIrrigationSystem()
+    _, _, act = sys.calculate_irrigation(
+        temperature=28, soil_humidity=35, rain_probability=20, air_humidity=45, wind_speed=12
+    )
+    assert set(act) == set(RULE_NAMES)
+    vals = activations_to_array(act)
+    assert vals.shape == (len(RULE_NAMES),)
+    for nombre, v in zip(RULE_NAMES, vals):
+        assert v == act[nombre]
+
+
+def test_clear_cache_vacia_el_cache():
+    sys = FuzzyIrrigationSystem()
+    primero = sys.calculate_irrigation(
+        temperature=28, soil_humidity=35, rain_probability=20, air_humidity=45, wind_speed=12
+    )
+    assert len(sys._cache) == 1
+    sys.clear_cache()
+    assert len(sys._cache) == 0
+    assert sys.calculate_irrigation(
+        temperature=28, soil_humidity=35, rain_probability=20, air_humidity=45, wind_speed=12
+    ) == primero
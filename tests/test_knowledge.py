@@ -18,3 +18,41 @@ def test_recomendacion_borde(kb):
 def test_planta_no_existente(kb):
     mensaje = kb.recomendar_riego("planta_fantasma", humedad_actual=50, temperatura_actual=20)
     assert "no se encontró información" in mensaje.lower()
+
+def test_historico_se_agrupa_hasta_flush(tmp_path, monkeypatch):
+    import json
+    import nucleo._historico_store as store
+    import nucleo.base_conocimientos as bc
+
+    path = tmp_path / "historico.jsonl"
+    monkeypatch.setattr(store, "HISTORICO_PATH", str(path))
+    monkeypatch.setattr(store, "HISTORICO_LEGACY_PATH", str(tmp_path / "historico.json"))
+    monkeypatch.setattr(store, "_HISTORICO_CACHE", None)
+    monkeypatch.setattr(store, "_historico_pendientes", [])
+    # Inmediatamente después de un volcado, los registros quedan en memoria
+    monkeypatch.setattr(store, "_last_historico_flush", store.time.time())
+
+    decision = {"tiempo_min": 10, "frecuencia": 2}
+    bc.get_recomendacion("Tomate", {"humedad_suelo": 50}, decision)
+    bc.get_recomendacion("Tomate", {"humedad_suelo": 40}, decision)
+    assert not path.exists()
+    assert [r["humedad_suelo"] for r in store.get()] == [50, 40]
+
+    bc.flush_historico()
+    bc.get_recomendacion("Tomate", {"humedad_suelo": 30}, decision)
+    bc.flush_historico()
+    registros = [json.loads(linea) for linea in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["humedad_suelo"] for r in registros] == [50, 40, 30]
+
+def test_tiempo_ajustado_batch_coincide_con_get_recomendacion(monkeypatch):
+    import nucleo.base_conocimientos as bc
+
+    monkeypatch.setattr(bc, "_append_historico", lambda registro: None)
+    plantas = ["Tomate", "Lechuga", "Cactus", "PlantaFantasma"]
+    humedades = [10.0, 55.0, 95.0, 40.0]
+    tiempos = [20.0, 35.0, 70.0, 15.0]
+
+    lote = bc.tiempo_ajustado_batch(plantas, humedades, tiempos)
+    for i, (p, hs, t) in enumerate(zip(plantas, humedades, tiempos)):
+        reco = bc.get_recomendacion(p, {"humedad_suelo": hs}, {"tiempo_min": t, "frecuencia": 2})
+        assert lote[i] == pytest.approx(reco["tiempo_ajustado"])
@@ -0,0 +1,7 @@
+from components.theme_toggle import _STATIC_CSS, _THEME_RULES
+
+
+def test_static_theme_css_coincide_con_las_reglas():
+    # static/theme.css se regenera con: python -m components.theme_toggle
+    with open(_STATIC_CSS, encoding="utf-8") as fh:
+        assert fh.read() == _THEME_RULES + "\n"
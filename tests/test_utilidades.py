@@ -9,7 +9,8 @@ from nucleo.utilidades import (
     export_history_csv,
     estimate_water_saving,
     clear_history,
-    timestamp
+    timestamp,
+    lttb_indices
 )
 
 
@@ -138,3 +139,48 @@ def test_clear_history(tmp_path):
     nucleo.utilidades.DATA_DIR = original_data_dir
     nucleo.utilidades.HISTORY_CSV = os.path.join(original_data_dir, "history.csv")
     nucleo.utilidades.HISTORY_JSONL = os.path.join(original_data_dir, "history.jsonl")
+
+
+def test_lttb_indices_short_series_untouched():
+    idx = lttb_indices([0, 1, 2, 3], [5, 6, 7, 8], 10)
+    assert list(idx) == [0, 1, 2, 3]
+
+
+def test_lttb_indices_keeps_extremes_and_peak():
+    n = 5000
+    x = list(range(n))
+    y = [0.0] * n
+    y[2500] = 100.0  # pico aislado
+
+    idx = lttb_indices(x, y, 100)
+
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert all(a < b for a, b in zip(idx, idx[1:]))
+    assert 2500 in idx
+
+
+def test_queue_history_buffers_until_flush(tmp_path):
+    import nucleo.utilidades
+    original_data_dir = nucleo.utilidades.DATA_DIR
+    nucleo.utilidades.DATA_DIR = str(tmp_path)
+    nucleo.utilidades.HISTORY_CSV = os.path.join(str(tmp_path), "history.csv")
+    nucleo.utilidades.HISTORY_JSONL = os.path.join(str(tmp_path), "history.jsonl")
+
+    record = {"ts": 1, "temperatura": 25.0, "humedad_suelo": 50.0, "prob_lluvia": 20.0, "humedad_ambiental": 60.0, "viento": 10.0, "planta": "test", "tiempo_min": 30.0, "frecuencia": 2.0}
+    nucleo.utilidades.flush_history()
+    # Inmediatamente después de un volcado, los registros quedan en memoria
+    nucleo.utilidades.queue_history(record)
+    nucleo.utilidades.queue_history({**record, "ts": 2})
+    assert len(load_history()) == 0
+
+    nucleo.utilidades.flush_history()
+    df = load_history()
+    assert list(df["ts"]) == [1, 2]
+    with open(nucleo.utilidades.HISTORY_JSONL, "r") as f:
+        assert len(f.readlines()) == 2
+
+    # Restore
+    nucleo.utilidades.DATA_DIR = original_data_dir
+    nucleo.utilidades.HISTORY_CSV = os.path.join(original_data_dir, "history.csv")
+    nucleo.utilidades.HISTORY_JSONL = os.path.join(original_data_dir, "history.jsonl")
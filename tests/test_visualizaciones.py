@@ -0,0 +1,19 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+
+def _pagina_visualizaciones():
+    from nucleo.visualizadores import renderizar_pagina_visualizaciones
+    renderizar_pagina_visualizaciones()
+
+
+@pytest.mark.parametrize(
+    "seccion",
+    ["🏠 Dashboard", "🎛️ Membresía", "🌐 3D", "🔍 Reglas", "🌱 Plantas", "📈 Sensibilidad"],
+)
+def test_pagina_visualizaciones_sin_errores(seccion):
+    at = AppTest.from_function(_pagina_visualizaciones, default_timeout=60).run()
+    at.radio(key="viz_section").set_value(seccion).run()
+
+    assert not at.exception
+    assert not [e.value for e in at.error]